@@ -0,0 +1,62 @@
+"""
+Event loop lag while a burst of passthrough handshakes runs its RSA work (key pair
+generation and session key decryption) inline on the loop or on the CryptoExecutor.
+
+    python -m benchmarks.crypto_offload [handshakes]
+"""
+import asyncio
+import base64
+import os
+import sys
+import time
+
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from plugp100.common.utils.loop_lag import LoopLagMonitor
+from plugp100.encryption.crypto_executor import CryptoExecutor
+from plugp100.encryption.key_pair import KeyPair
+from plugp100.encryption.tp_link_cipher import TpLinkCipherCryptography
+
+
+def _device_handshake_key(key_pair: KeyPair) -> str:
+    # what the device answers: the session key and iv encrypted with our public key
+    public_key = key_pair.get_rsa_private_key().public_key()
+    return base64.b64encode(
+        public_key.encrypt(os.urandom(32), padding.PKCS1v15())
+    ).decode()
+
+
+async def _handshake(crypto: CryptoExecutor, offload: bool):
+    if offload:
+        key_pair = await crypto.run(KeyPair.create_key_pair)
+    else:
+        key_pair = KeyPair.create_key_pair()
+    await asyncio.sleep(0)  # the handshake request
+    handshake_key = _device_handshake_key(key_pair)
+    if offload:
+        await crypto.run(
+            TpLinkCipherCryptography.create_from_keypair, handshake_key, key_pair
+        )
+    else:
+        TpLinkCipherCryptography.create_from_keypair(handshake_key, key_pair)
+
+
+async def main(handshakes: int):
+    crypto = CryptoExecutor()
+    print(f"{'':<8}{'elapsed':>10}{'max lag':>10}{'mean lag':>10}{'late':>8}")
+    for name, offload in (("inline", False), ("offload", True)):
+        async with LoopLagMonitor(interval=0.005, late_threshold=0.02) as monitor:
+            start = time.perf_counter()
+            await asyncio.gather(
+                *[_handshake(crypto, offload) for _ in range(handshakes)]
+            )
+            elapsed = time.perf_counter() - start
+        stats = monitor.stats
+        print(
+            f"{name:<8}{elapsed:>9.2f}s{stats.max_lag * 1000:>8.1f}ms"
+            f"{stats.mean_lag * 1000:>8.1f}ms{stats.late_samples:>8}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
@@ -0,0 +1,55 @@
+"""
+Requests per second towards a single device, with and without connection reuse.
+
+A local aiohttp server stands in for the device. Loopback connects are far cheaper
+than on a real Wi-Fi link, so the gap measured here is a lower bound.
+
+    python -m benchmarks.keep_alive [requests]
+"""
+import asyncio
+import sys
+import time
+
+from aiohttp import web
+
+from plugp100.common.utils.http_client import AsyncHttp
+
+
+async def _start_device_stub() -> (web.AppRunner, str):
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(body=await request.read())
+
+    app = web.Application()
+    app.router.add_post("/app/request", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/app/request"
+
+
+async def _run(url: str, keep_alive: bool, requests: int) -> float:
+    http = AsyncHttp(keep_alive=keep_alive)
+    payload = b"x" * 256
+    try:
+        start = time.perf_counter()
+        for seq in range(requests):
+            await http.async_make_post_bytes(url, data=payload, params={"seq": seq})
+        return requests / (time.perf_counter() - start)
+    finally:
+        await http.close()
+
+
+async def main(requests: int):
+    runner, url = await _start_device_stub()
+    try:
+        for keep_alive in (False, True):
+            rate = await _run(url, keep_alive, requests)
+            print(f"keep_alive={keep_alive!s:<5} {rate:10.1f} req/s")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,65 @@
+"""
+KLAP messages encrypted and decrypted per second, comparing the former implementation,
+which built a new cipher, padder and hash for every message, with the per-session state
+kept by KlapChiper.
+
+    python -m benchmarks.klap_chiper [iterations]
+"""
+import os
+import sys
+import time
+
+from cryptography.hazmat.primitives import hashes, padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from plugp100.protocol.klap_protocol import KlapChiper
+
+_REQUEST = b'{"method": "get_device_info", "params": null}'
+_RESPONSE = os.urandom(900)
+
+
+class _PerMessageChiper(KlapChiper):
+    def encrypt(self, msg: bytes):
+        self._seq = self._seq + 1
+        iv = self._iv + self._seq.to_bytes(4, "big", signed=True)
+        assert len(iv) == 16
+        encryptor = Cipher(algorithms.AES(self._key), modes.CBC(iv)).encryptor()
+        padder = padding.PKCS7(128).padder()
+        padded_data = padder.update(msg) + padder.finalize()
+        ciphertext = encryptor.update(padded_data) + encryptor.finalize()
+        digest = hashes.Hash(hashes.SHA256())
+        digest.update(self._sig + self._seq.to_bytes(4, "big", signed=True) + ciphertext)
+        return digest.finalize() + ciphertext, self._seq
+
+    def decrypt_bytes(self, msg: bytes, seq: int) -> bytes:
+        iv = self._iv + seq.to_bytes(4, "big", signed=True)
+        assert len(iv) == 16
+        decryptor = Cipher(algorithms.AES(self._key), modes.CBC(iv)).decryptor()
+        dp = decryptor.update(msg[32:]) + decryptor.finalize()
+        unpadder = padding.PKCS7(128).unpadder()
+        return unpadder.update(dp) + unpadder.finalize()
+
+
+def _rate(action, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        action()
+    return iterations / (time.perf_counter() - start)
+
+
+def main(iterations: int):
+    seeds = os.urandom(16), os.urandom(16), os.urandom(32)
+    print(f"{'':<12}{'encrypt':>14}{'decrypt':>14}")
+    for name, chiper_type in (
+        ("per message", _PerMessageChiper),
+        ("session", KlapChiper),
+    ):
+        chiper = chiper_type(*seeds)
+        response, seq = chiper.encrypt(_RESPONSE)
+        encrypt = _rate(lambda: chiper.encrypt(_REQUEST), iterations)
+        decrypt = _rate(lambda: chiper.decrypt_bytes(response, seq), iterations)
+        print(f"{name:<12}{encrypt:>12.0f}/s{decrypt:>12.0f}/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,106 @@
+"""
+Encrypt + decrypt round trips per second for secure passthrough payloads the size of a
+real get_device_info response, comparing the former string API, which built a new
+cipher context and padder for every message, with the bytes API.
+
+    python -m benchmarks.passthrough_cipher [iterations]
+"""
+import base64
+import json
+import os
+import sys
+import time
+
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from plugp100.encryption.tp_link_cipher import TpLinkCipherCryptography
+
+_DEVICE_INFO = {
+    "error_code": 0,
+    "result": {
+        "device_id": "80225A84E5F52C914A3A1B6E3BA2A2C521E1B5A0",
+        "fw_ver": "1.2.5 Build 20230615 Rel. 39405",
+        "hw_ver": "1.0",
+        "type": "SMART.TAPOPLUG",
+        "model": "P110",
+        "mac": "3C-52-A1-00-00-00",
+        "hw_id": "F6E1E7E79CD5C2E8A5E4D5F1F0A4E2E5",
+        "fw_id": "00000000000000000000000000000000",
+        "oem_id": "8E2F5B3A55B0E6B1C83E2F0B2E4F7A3D",
+        "ip": "192.168.1.42",
+        "time_diff": 60,
+        "ssid": "SG9tZU5ldHdvcms=",
+        "rssi": -52,
+        "signal_level": 2,
+        "auto_off_status": "off",
+        "auto_off_remain_time": 0,
+        "latitude": 0,
+        "longitude": 0,
+        "lang": "en_US",
+        "avatar": "plug",
+        "region": "Europe/Rome",
+        "specs": "",
+        "nickname": "TGl2aW5nIHJvb20gbGFtcA==",
+        "has_set_location_info": True,
+        "device_on": True,
+        "on_time": 5321,
+        "default_states": {"type": "last_states", "state": {}},
+        "overheated": False,
+        "power_protection_status": "normal",
+        "overcurrent_status": "normal",
+        "charging_status": "normal",
+    },
+}
+
+
+class _StringCipher:
+    def __init__(self, key: bytes, iv: bytes):
+        self.cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
+        self.padding_strategy = padding.PKCS7(algorithms.AES.block_size)
+
+    def encrypt(self, data: str) -> str:
+        encryptor = self.cipher.encryptor()
+        padder = self.padding_strategy.padder()
+        padded_data = padder.update(data.encode("UTF-8")) + padder.finalize()
+        encrypted = encryptor.update(padded_data) + encryptor.finalize()
+        return base64.b64encode(encrypted).decode("UTF-8")
+
+    def decrypt(self, data: str) -> str:
+        decryptor = self.cipher.decryptor()
+        unpadder = self.padding_strategy.unpadder()
+        decrypted = (
+            decryptor.update(base64.b64decode(data.encode("UTF-8")))
+            + decryptor.finalize()
+        )
+        return (unpadder.update(decrypted) + unpadder.finalize()).decode("UTF-8")
+
+
+def _rate(round_trip, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        round_trip()
+    return iterations / (time.perf_counter() - start)
+
+
+def main(iterations: int):
+    key, iv = os.urandom(16), os.urandom(16)
+    payload = json.dumps(_DEVICE_INFO)
+    raw_payload = payload.encode()
+    legacy = _StringCipher(key, iv)
+    cipher = TpLinkCipherCryptography(key, iv)
+
+    def string_round_trip():
+        legacy.decrypt(legacy.encrypt(payload))
+
+    def bytes_round_trip():
+        encoded = base64.b64encode(cipher.encrypt_bytes(raw_payload))
+        cipher.decrypt_bytes(base64.b64decode(encoded))
+
+    print(f"payload {len(raw_payload)} bytes")
+    for name, round_trip in (("str", string_round_trip), ("bytes", bytes_round_trip)):
+        print(f"{name:<6} {_rate(round_trip, iterations):10.0f} round trips/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
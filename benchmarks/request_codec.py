@@ -0,0 +1,62 @@
+"""
+Requests encoded per second by jsons and by the precompiled request codec, using the
+stdlib `json` backend and orjson when installed.
+
+    python -m benchmarks.request_codec [iterations]
+"""
+import sys
+import time
+from unittest.mock import patch
+
+import jsons
+
+from plugp100.common.utils import json_utils
+from plugp100.requests.request_codec import dumps_request
+from plugp100.requests.set_device_info.set_light_color_info_params import (
+    LightColorDeviceInfoParams,
+)
+from plugp100.requests.tapo_request import TapoRequest, MultipleRequestParams
+
+_REQUESTS = {
+    "get_device_info": TapoRequest.get_device_info()
+    .with_request_id(1234567890123)
+    .with_request_time_millis(1700000000000)
+    .with_terminal_uuid("6Yc1qPfJOVJ2xrOE4HFfkg=="),
+    "set_device_info": TapoRequest.set_device_info(
+        LightColorDeviceInfoParams(device_on=True, hue=120, saturation=80)
+    ),
+    "control_child": TapoRequest.control_child(
+        "802DDA0F04E2A3E3F6D1A6B2B2F8A1C9",
+        TapoRequest.set_device_info({"device_on": False}),
+    ),
+    "multipleRequest": TapoRequest.multiple_request(
+        MultipleRequestParams([TapoRequest.get_device_info()] * 5)
+    ),
+}
+
+
+def _rate(encode, request: TapoRequest, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode(request)
+    return iterations / (time.perf_counter() - start)
+
+
+def main(iterations: int):
+    encoders = [("jsons", jsons.dumps), ("codec+json", dumps_request)]
+    if json_utils.orjson is not None:
+        encoders.append(("codec+orjson", dumps_request))
+    print(f"{'request':<16}" + "".join(f"{name:>14}" for name, _ in encoders))
+    for method, request in _REQUESTS.items():
+        rates = []
+        for name, encode in encoders:
+            if name == "codec+json":
+                with patch.object(json_utils, "orjson", None):
+                    rates.append(_rate(encode, request, iterations))
+            else:
+                rates.append(_rate(encode, request, iterations))
+        print(f"{method:<16}" + "".join(f"{rate:>12.0f}/s" for rate in rates))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
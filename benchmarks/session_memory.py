@@ -0,0 +1,50 @@
+"""
+Memory held by 1,000 clients: one aiohttp session each versus the shared default
+session of the event loop.
+
+    python -m benchmarks.session_memory [clients]
+"""
+import asyncio
+import sys
+import tracemalloc
+
+import aiohttp
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.protocol.klap_protocol import KlapProtocol
+
+
+async def _measure(clients: int, dedicated_session: bool) -> int:
+    credential = AuthCredential("user@example.com", "password")
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    protocols = []
+    for i in range(clients):
+        session = aiohttp.ClientSession() if dedicated_session else None
+        protocol = KlapProtocol(
+            credential, f"http://10.0.{i // 250}.{i % 250}:80/app", session
+        )
+        # the default session is acquired on first use
+        protocol._transport._http.session
+        protocols.append((protocol, session))
+    used = sum(
+        stat.size_diff
+        for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename")
+    )
+    tracemalloc.stop()
+    for protocol, session in protocols:
+        await protocol.close()
+        if session is not None:
+            await session.close()
+    return used
+
+
+async def main(clients: int):
+    for dedicated_session in (True, False):
+        used = await _measure(clients, dedicated_session)
+        label = "session per client" if dedicated_session else "shared default session"
+        print(f"{label:<24} {used / 1024:10.1f} KiB for {clients} clients")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,107 @@
+"""
+Cost of reconnecting to an HTTPS device with and without TLS session resumption,
+measured against a local TLS stand-in server with a self-signed certificate. Every
+request is made on a new connection to isolate the handshake cost.
+
+    python -m benchmarks.tls_resumption [connections]
+"""
+import asyncio
+import datetime
+import os
+import ssl
+import sys
+import tempfile
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+from plugp100.common.transport.stream_transport import StreamTransport
+from plugp100.common.transport.tls import DeviceSSLContext
+
+
+def _self_signed_server_context(directory: str) -> ssl.SSLContext:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "tapo-device")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_file = os.path.join(directory, "cert.pem")
+    key_file = os.path.join(directory, "key.pem")
+    with open(cert_file, "wb") as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_file, "wb") as f:
+        f.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            )
+        )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            content_length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                if line.lower().startswith(b"content-length:"):
+                    content_length = int(line.split(b":")[1])
+            if not line:
+                break
+            body = await reader.readexactly(content_length)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body))
+            writer.write(body)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _run(url: str, ssl_context: ssl.SSLContext, connections: int) -> float:
+    transport = StreamTransport(ssl_context)
+    start = time.perf_counter()
+    for _ in range(connections):
+        await transport.post(url, b"{}")
+        await transport.close()
+    return (time.perf_counter() - start) / connections
+
+
+async def main(connections: int):
+    with tempfile.TemporaryDirectory() as directory:
+        server_context = _self_signed_server_context(directory)
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0, ssl=server_context)
+    url = f"https://127.0.0.1:{server.sockets[0].getsockname()[1]}/app"
+
+    full = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    full.check_hostname = False
+    full.verify_mode = ssl.CERT_NONE
+    resuming = DeviceSSLContext()
+    try:
+        for name, context in (("full handshake", full), ("resumed", resuming)):
+            elapsed = await _run(url, context, connections)
+            print(f"{name:<15} {elapsed * 1000:7.2f} ms/connection")
+        print(
+            f"resumed {resuming.resumed_handshakes} of {resuming.handshakes} handshakes"
+        )
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
@@ -0,0 +1,74 @@
+"""
+Client CPU time per request for the aiohttp and the asyncio-streams transports, posting
+a 16-byte body like the KLAP handshake. The stand-in device runs on its own thread so
+only the client side is accounted.
+
+    python -m benchmarks.transport_cpu [requests]
+"""
+import asyncio
+import sys
+import threading
+import time
+
+from aiohttp import web
+
+from plugp100.common.transport.aiohttp_transport import AiohttpTransport
+from plugp100.common.transport.stream_transport import StreamTransport
+
+
+def _start_device_stub() -> (asyncio.AbstractEventLoop, str):
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    address = {}
+
+    async def handle(request: web.Request) -> web.Response:
+        response = web.Response(body=(await request.read()) * 3)
+        response.set_cookie("TP_SESSIONID", "0123456789ABCDEF")
+        return response
+
+    async def serve():
+        app = web.Application()
+        app.router.add_post("/app/handshake1", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        address["url"] = f"http://127.0.0.1:{port}/app/handshake1"
+        ready.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return loop, address["url"]
+
+
+async def _run(transport, url: str, requests: int) -> float:
+    payload = b"s" * 16
+    cookies = {"TP_SESSIONID": "0123456789ABCDEF"}
+    try:
+        await transport.post(url, payload, cookies=cookies, params={"seq": 0})
+        start = time.thread_time()
+        for seq in range(requests):
+            await transport.post(url, payload, cookies=cookies, params={"seq": seq})
+        return (time.thread_time() - start) / requests
+    finally:
+        await transport.close()
+
+
+async def main(requests: int):
+    _, url = _start_device_stub()
+    for name, transport in (
+        ("aiohttp", AiohttpTransport(keep_alive=True)),
+        ("streams", StreamTransport()),
+    ):
+        cpu = await _run(transport, url, requests)
+        print(f"{name:<8} {cpu * 1_000_000:8.1f} us CPU/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000))
@@ -1,6 +1,6 @@
 import logging
 from logging import Logger
-from typing import Callable, Any, Set
+from typing import Callable, Any, Set, Dict, List
 
 from plugp100.api.base_tapo_device import _BaseTapoDevice
 from plugp100.api.hub.hub_device_tracker import (
@@ -11,6 +11,10 @@ from plugp100.api.tapo_client import TapoClient, Json
 from plugp100.common.functional.tri import Try
 from plugp100.common.poll_tracker import PollTracker, PollSubscription
 from plugp100.common.utils.json_utils import dataclass_encode_json
+from plugp100.protocol.handshake_scheduler import (
+    HandshakePriority,
+    handshake_priority,
+)
 from plugp100.requests.set_device_info.play_alarm_params import PlayAlarmParams
 from plugp100.requests.tapo_request import TapoRequest
 from plugp100.responses.alarm_type_list import AlarmTypeList
@@ -89,17 +93,29 @@ class HubDevice(_BaseTapoDevice):
         """
         return await self._api.control_child(device_id, request)
 
+    async def control_children(
+        self, requests: Dict[str, List[TapoRequest]]
+    ) -> Dict[str, List[Try[Json]]]:
+        """
+        The function `control_children` sends requests to many child devices at once, packing as many of them in each
+        hub request as the hub accepts.
+
+        @param requests: the requests to send to each child device, by device ID
+        @type requests: Dict[str, List[TapoRequest]]
+        @return: the results of the requests of each child device, by device ID, in the same order as the requests.
+        """
+        return await self._api.control_children(requests)
+
     def subscribe_device_association(
         self, callback: Callable[[HubDeviceEvent], Any]
     ) -> PollSubscription:
         return self._poll_tracker.subscribe(callback)
 
     async def _poll_device_list(self, last_state: Set[str]) -> Set[str]:
-        return (
-            (await self._api.get_child_device_list())
-            .map(lambda x: x.get_device_ids())
-            .get_or_else(set())
-        )
+        # a periodic poll, user actions get their handshakes admitted first
+        with handshake_priority(HandshakePriority.BACKGROUND):
+            response = await self._api.get_child_device_list()
+        return response.map(lambda x: x.get_device_ids()).get_or_else(set())
 
     async def get_component_negotiation_child(self, child_device_id) -> Try[Components]:
         return (
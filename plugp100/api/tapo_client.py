@@ -1,23 +1,43 @@
+import asyncio
+import collections
+import itertools
 import logging
 from enum import Enum
 from time import time
-from typing import Optional, Any, cast
+from typing import (
+    Optional,
+    Any,
+    cast,
+    List,
+    Tuple,
+    Set,
+    Callable,
+    AsyncIterator,
+)
 
 import aiohttp
 
 from plugp100.api.light_effect import LightEffect
 from plugp100.common.credentials import AuthCredential
 from plugp100.common.functional.tri import Try, Failure, Success
+from plugp100.common.transport.http_transport import HttpTransport
 from plugp100.common.utils.json_utils import Json, dataclass_encode_json
+from plugp100.discovery.discovered_device import EncryptionScheme, DiscoveredDevice
 from plugp100.protocol.klap_protocol import KlapProtocol
 from plugp100.protocol.passthrough_protocol import PassthroughProtocol
+from plugp100.protocol.session_store import (
+    SessionStore,
+    async_load_capabilities,
+    async_save_capability,
+)
 from plugp100.protocol.tapo_protocol import TapoProtocol
 from plugp100.requests.tapo_request import TapoRequest, MultipleRequestParams
-from plugp100.responses.child_device_list import ChildDeviceList
+from plugp100.responses.child_device_list import ChildDeviceList, Child
 from plugp100.responses.components import Components
 from plugp100.responses.energy_info import EnergyInfo
 from plugp100.responses.power_info import PowerInfo
-from plugp100.responses.tapo_exception import TapoException
+from plugp100.responses.tapo_exception import TapoException, TapoError
+from plugp100.responses.tapo_response import TapoResponse
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +48,30 @@ class TapoProtocolType(Enum):
     AUTO = 3
 
 
+# encrypt_type reported by discovery
+_PROTOCOL_BY_ENCRYPT_TYPE = {
+    "KLAP": TapoProtocolType.KLAP,
+    "AES": TapoProtocolType.PASSTHROUGH,
+}
+
+# errors answered to a method the device doesn't know
+_METHOD_NOT_SUPPORTED_ERRORS = frozenset({-1002, 1003, -40210})
+# errors answered to a multipleRequest carrying more requests than the device accepts
+_BATCH_TOO_LARGE_ERRORS = frozenset(
+    {TapoError.ERR_REQUEST_LEN_ERROR.value, TapoError.ERR_MULTI_REQUEST_FAILED.value}
+)
+
+# protocol found for each device, by MAC address or url
+_device_protocols: dict[str, TapoProtocolType] = {}
+
+
 class TapoClient:
+    DEFAULT_MULTI_REQUEST_BATCH_SIZE = 5
+    # models accepting a different number of requests in one multipleRequest; none is
+    # known to differ so far, and a client whose device rejects a batch as too large
+    # lowers its own size anyway
+    MULTI_REQUEST_BATCH_SIZES: dict[str, int] = {}
+
     @staticmethod
     def create(
         credential: AuthCredential,
@@ -37,22 +80,66 @@ class TapoClient:
         is_https: bool = False,
         http_session: Optional[aiohttp.ClientSession] = None,
         protocol_type: TapoProtocolType = TapoProtocolType.AUTO,
+        keep_alive: Optional[bool] = None,
+        transport: Optional[HttpTransport] = None,
+        timeout: Optional[float] = None,
+        encryption_scheme: Optional[EncryptionScheme] = None,
+        session_store: Optional[SessionStore] = None,
+        discovered_device: Optional[DiscoveredDevice] = None,
+        batch_window: Optional[float] = None,
     ) -> "TapoClient":
-        url = f"{'https' if is_https else 'http'}://{address}:{port}/app"
-        protocol = None
-        if protocol_type == TapoProtocolType.KLAP:
-            protocol = KlapProtocol(
-                auth_credential=credential,
-                url=url,
-                http_session=http_session,
-            )
-        elif protocol_type == TapoProtocolType.PASSTHROUGH:
-            protocol = PassthroughProtocol(
-                auth_credential=credential,
-                url=url,
-                http_session=http_session,
+        """
+        Create a client for the device at `address`. When the `encryption_scheme` reported
+        by discovery is given, scheme, port and protocol are taken from it, so that no
+        probing is needed; `discovered_device` provides it along with the device MAC.
+        Connections to HTTPS devices are kept alive unless `keep_alive` says otherwise,
+        so the TLS handshake is paid once and later reconnections resume the TLS
+        session. Sessions are saved to `session_store`, if any, and used again by later
+        clients while still valid, as is the protocol found by probing. See `__init__`
+        for `batch_window`.
+        """
+        mac = None
+        batch_size = TapoClient.DEFAULT_MULTI_REQUEST_BATCH_SIZE
+        if discovered_device is not None:
+            encryption_scheme = encryption_scheme or discovered_device.mgt_encrypt_schm
+            mac = discovered_device.mac
+            batch_size = TapoClient.multi_request_batch_size_for(
+                discovered_device.device_model
             )
-        return TapoClient(credential, url, protocol, http_session)
+        login_version = None
+        is_discovered_protocol = False
+        if encryption_scheme is not None:
+            is_https = bool(encryption_scheme.is_support_https)
+            port = encryption_scheme.http_port or port
+            login_version = encryption_scheme.lv
+            if protocol_type == TapoProtocolType.AUTO:
+                protocol_type = _PROTOCOL_BY_ENCRYPT_TYPE.get(
+                    (encryption_scheme.encrypt_type or "").upper(),
+                    TapoProtocolType.AUTO,
+                )
+                is_discovered_protocol = protocol_type != TapoProtocolType.AUTO
+        keep_alive = is_https if keep_alive is None else keep_alive
+        url = f"{'https' if is_https else 'http'}://{address}:{port}/app"
+        client = TapoClient(
+            credential,
+            url,
+            None,
+            http_session,
+            keep_alive,
+            transport,
+            timeout,
+            session_store,
+            mac,
+            batch_window,
+        )
+        client.multi_request_batch_size = batch_size
+        if protocol_type != TapoProtocolType.AUTO:
+            client._protocol = client._create_protocol(protocol_type, login_version)
+            if is_discovered_protocol:
+                # saved to the store on first use, outside of the event loop here
+                _device_protocols[client._device_key] = protocol_type
+                client._discovered_protocol = protocol_type
+        return client
 
     def __init__(
         self,
@@ -60,22 +147,181 @@ class TapoClient:
         url: str,
         protocol: TapoProtocol = TapoProtocol,
         http_session: Optional[aiohttp.ClientSession] = None,
+        keep_alive: bool = False,
+        transport: Optional[HttpTransport] = None,
+        timeout: Optional[float] = None,
+        session_store: Optional[SessionStore] = None,
+        mac: Optional[str] = None,
+        batch_window: Optional[float] = None,
     ):
+        """
+        @param mac: the device MAC address, when known, under which the protocol found
+        by probing is remembered instead of `url`, which may change over time.
+        @param batch_window: when set, requests made within this many seconds of each
+        other are sent together in one `multipleRequest`, as `execute_many` does, and
+        each caller gets its own result. Requests given their own timeout are sent
+        right away, as are all requests once the device is found not to support
+        `multipleRequest`.
+        """
         self._auth_credential = auth_credential
         self._url = url
         self._http_session = http_session
+        self._keep_alive = keep_alive
+        self._transport = transport
+        self._timeout = timeout
+        self._session_store = session_store
+        self._device_key = mac.lower() if mac else url
         self._protocol: Optional[TapoProtocol] = protocol
+        self._discovered_protocol: Optional[TapoProtocolType] = None
+        self.multi_request_batch_size = TapoClient.DEFAULT_MULTI_REQUEST_BATCH_SIZE
+        self._batch_window = batch_window
+        self._supports_multiple_request = True
+        self._pending_batch: List[Tuple[TapoRequest, asyncio.Future]] = []
+        self._batch_timer: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def multi_request_batch_size_for(model: Optional[str]) -> int:
+        """How many requests a device `model`, like "P110(EU)", accepts at once."""
+        return TapoClient.MULTI_REQUEST_BATCH_SIZES.get(
+            (model or "").split("(")[0].strip().upper(),
+            TapoClient.DEFAULT_MULTI_REQUEST_BATCH_SIZE,
+        )
 
     async def _initialize_protocol_if_needed(self):
         if self._protocol is None:
             await self._guess_protocol()
+        elif self._discovered_protocol is not None:
+            protocol_type, self._discovered_protocol = self._discovered_protocol, None
+            await self._remember_protocol(protocol_type)
 
     async def close(self):
-        await self._protocol.close()
+        self._flush_batch()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        if self._protocol is not None:
+            await self._protocol.close()
 
-    async def execute_raw_request(self, request: "TapoRequest") -> Try[Json]:
+    async def execute_raw_request(
+        self, request: "TapoRequest", timeout: Optional[float] = None
+    ) -> Try[Json]:
+        """
+        Send a request to the device. `timeout` overrides the client timeout for this
+        call only and bounds handshake, retries and the request together.
+        """
         await self._initialize_protocol_if_needed()
-        return (await self._protocol.send_request(request)).map(lambda x: x.result)
+        if (
+            self._batch_window is None
+            or not self._supports_multiple_request
+            or timeout is not None
+            or request.method == "multipleRequest"
+        ):
+            return await self._send(request, timeout)
+        return await self._send_in_next_batch(request)
+
+    async def execute_many(
+        self, requests: List[TapoRequest], timeout: Optional[float] = None
+    ) -> List[Try[Json]]:
+        """
+        Send `requests` packed in as few `multipleRequest` round trips as the device
+        allows, at most `multi_request_batch_size` requests each, one round trip after
+        the other. Round trips the device rejects as too large are split, and
+        `multi_request_batch_size` lowered accordingly.
+
+        @param requests: the requests to send, executed by the device in this order
+        @param timeout: optional time budget in seconds of each round trip, overriding
+        the client timeout
+        @return: the result of each request, in the same order: a request failing
+        doesn't fail the others, unless the whole round trip fails. Requests failing
+        inside a round trip are sent again on their own.
+        """
+        await self._initialize_protocol_if_needed()
+        batch_size = max(self.multi_request_batch_size, 1)
+        results: List[Try[Json]] = []
+        for start in range(0, len(requests), batch_size):
+            batch = requests[start : start + batch_size]
+            results += await self._send_batch(batch, timeout)
+        return results
+
+    async def _send_in_next_batch(self, request: TapoRequest) -> Try[Json]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_batch.append((request, future))
+        if len(self._pending_batch) >= self.multi_request_batch_size:
+            self._flush_batch()
+        elif self._batch_timer is None:
+            self._batch_timer = loop.call_later(self._batch_window, self._flush_batch)
+        return await future
+
+    def _flush_batch(self):
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        batch, self._pending_batch = self._pending_batch, []
+        if batch:
+            task = asyncio.create_task(self._send_pending_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_pending_batch(self, batch: List[Tuple[TapoRequest, asyncio.Future]]):
+        try:
+            results = await self._send_batch([request for request, _ in batch], None)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            results = [Failure(e)] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _send(self, request: TapoRequest, timeout: Optional[float]) -> Try[Json]:
+        return (await self._send_to_protocol(request, timeout)).map(lambda x: x.result)
+
+    async def _send_to_protocol(
+        self, request: TapoRequest, timeout: Optional[float]
+    ) -> Try[TapoResponse[Json]]:
+        if timeout is None:
+            # protocols written before `timeout` was added don't accept it
+            return await self._protocol.send_request(request)
+        return await self._protocol.send_request(request, timeout=timeout)
+
+    async def _send_batch(
+        self, requests: List[TapoRequest], timeout: Optional[float]
+    ) -> List[Try[Json]]:
+        if len(requests) == 1 or not self._supports_multiple_request:
+            return [await self._send(request, timeout) for request in requests]
+        response = await self._send(
+            TapoRequest.multiple_request(MultipleRequestParams(requests)), timeout
+        )
+        if _is_error(response, _BATCH_TOO_LARGE_ERRORS):
+            # later batches start at the size which is accepted
+            half = (len(requests) + 1) // 2
+            self.multi_request_batch_size = min(self.multi_request_batch_size, half)
+            logger.info(
+                "%s rejected %d requests at once, sending them %d at a time",
+                self._url,
+                len(requests),
+                half,
+            )
+            first = await self._send_batch(requests[:half], timeout)
+            return first + await self._send_batch(requests[half:], timeout)
+        if _is_error(response, _METHOD_NOT_SUPPORTED_ERRORS):
+            logger.info(
+                "%s doesn't support multipleRequest, sending requests one by one",
+                self._url,
+            )
+            self._supports_multiple_request = False
+            return [await self._send(request, timeout) for request in requests]
+        if response.is_failure():
+            return [response] * len(requests)
+        results = _split_multiple_responses(requests, response.get())
+        # an entry failing inside the batch gets another chance on its own
+        return [
+            await self._send(request, timeout) if result.is_failure() else result
+            for request, result in zip(requests, results)
+        ]
 
     async def get_component_negotiation(self) -> Try[Components]:
         return (await self.execute_raw_request(TapoRequest.component_negotiation())).map(
@@ -136,33 +382,82 @@ class TapoClient:
         )
         return response.map(lambda _: True)
 
-    async def get_child_device_list(self, all_pages: bool = True) -> Try[ChildDeviceList]:
+    async def get_child_device_list(
+        self, all_pages: bool = True, fan_out: int = 4
+    ) -> Try[ChildDeviceList]:
         """
         The function `get_child_device_list` retrieves a list of child devices asynchronously and returns either the list or
         an exception.
+        @param all_pages: whether to retrieve every page of the list, or only the first one
+        @param fan_out: how many of the pages after the first one are requested at once
         @return: an `Either` object, which can contain either a `ChildDeviceList` or an `Exception`.
         """
-        request = TapoRequest.get_child_device_list(0)
-        response = (await self.execute_raw_request(request)).map(
-            lambda x: ChildDeviceList.try_from_json(**x)
-        )
+        head: Optional[ChildDeviceList] = None
+        children: List[Json] = []
+        async for page in self._iter_child_device_pages(all_pages, fan_out):
+            if page.is_failure():
+                return page
+            head = head or page.get()
+            children += page.get().child_device_list
+        return Success(ChildDeviceList(children, head.start_index, head.sum))
 
-        if all_pages and response.is_success():
-            return await self._get_all_pagination(response.get())
+    async def iter_child_devices(
+        self, parse: Callable[[Json], Child] = lambda x: x, fan_out: int = 4
+    ) -> AsyncIterator[Child]:
+        """
+        The function `iter_child_devices` yields the child devices page by page, as soon as each page arrives, without
+        holding the whole list.
 
-        return response
+        @param parse: turns each child JSON into the value yielded, e.g. `lambda x: PowerStripChild.try_from_json(**x)`;
+        by default the JSON itself is yielded
+        @param fan_out: how many of the pages after the first one are requested at once
+        @raise Exception: the error of the first page which couldn't be retrieved
+        """
+        async for page in self._iter_child_device_pages(True, fan_out):
+            for child in page.get_or_raise().child_device_list:
+                yield parse(child)
 
-    async def _get_all_pagination(self, head: ChildDeviceList) -> Try[ChildDeviceList]:
-        current_head = Try.of(head)
-        while current_head.map(lambda x: x.has_next()).get_or_else(False):
-            previous_head = current_head.get()
-            request = TapoRequest.get_child_device_list(previous_head.get_next_index())
-            current_head = (
-                (await self.execute_raw_request(request))
-                .map(lambda x: ChildDeviceList.try_from_json(**x))
-                .map(lambda x: previous_head.merge(x))
-            )
-        return current_head
+    async def _iter_child_device_pages(
+        self, all_pages: bool, fan_out: int
+    ) -> AsyncIterator[Try[ChildDeviceList]]:
+        # pages are yielded in order up to the first failure; once the first page is
+        # known, so is the start index of every other page, which are requested ahead
+        # up to `fan_out` at a time
+        head = await self._get_child_device_page(0)
+        page_size = len(head.get().child_device_list) if head.is_success() else 0
+        if not all_pages or page_size == 0:
+            yield head
+            return
+        start_indexes = iter(
+            range(head.get().start_index + page_size, head.get().sum, page_size)
+        )
+        requested = collections.deque(
+            asyncio.create_task(self._get_child_device_page(start_index))
+            for start_index in itertools.islice(start_indexes, max(fan_out, 1))
+        )
+        try:
+            yield head
+            while requested:
+                page = await requested.popleft()
+                next_start_index = next(start_indexes, None)
+                if next_start_index is not None:
+                    requested.append(
+                        asyncio.create_task(self._get_child_device_page(next_start_index))
+                    )
+                yield page
+                if page.is_failure():
+                    return
+        finally:
+            for task in requested:
+                task.cancel()
+
+    async def _get_child_device_page(self, start_index: int) -> Try[ChildDeviceList]:
+        # sent right away, pages fetched in parallel must not wait for a batch window
+        await self._initialize_protocol_if_needed()
+        request = TapoRequest.get_child_device_list(start_index)
+        return (await self._send(request, None)).map(
+            lambda x: ChildDeviceList.try_from_json(**x)
+        )
 
     async def get_child_device_component_list(self) -> Try[Json]:
         """
@@ -173,7 +468,9 @@ class TapoClient:
         request = TapoRequest.get_child_device_component_list()
         return (await self.execute_raw_request(request)).map(lambda x: x)
 
-    async def control_child(self, child_id: str, request: TapoRequest) -> Try[Json]:
+    async def control_child(
+        self, child_id: str, request: TapoRequest, timeout: Optional[float] = None
+    ) -> Try[Json]:
         """
         The function `control_child` is an asynchronous method that sends a control request to a child device and returns
         the response or an exception.
@@ -183,14 +480,12 @@ class TapoClient:
         @param request: The `request` parameter is an instance of the `TapoRequest` class. It represents a request to be
         sent to the Tapo device.
         @type request: TapoRequest
+        @param timeout: optional time budget in seconds overriding the client timeout
         @return: an instance of the `Either` class, which can contain either a `Json` object or an `Exception`.
         """
         await self._initialize_protocol_if_needed()
-        multiple_request = TapoRequest.multiple_request(
-            MultipleRequestParams([request])
-        ).with_request_time_millis(round(time() * 1000))
-        request = TapoRequest.control_child(child_id, multiple_request)
-        response = await self._protocol.send_request(request)
+        request = _control_child_request(child_id, [request])
+        response = await self._send_to_protocol(request, timeout)
         if response.is_success():
             try:
                 responses = response.get().result["responseData"]["result"]["responses"]
@@ -206,6 +501,49 @@ class TapoClient:
                 return Failure(e)
         return cast(Failure, response)
 
+    async def control_children(
+        self,
+        requests: dict[str, List[TapoRequest]],
+        timeout: Optional[float] = None,
+    ) -> dict[str, List[Try[Json]]]:
+        """
+        Send requests to many child devices packed in as few round trips as the device
+        allows: each round trip carries at most `multi_request_batch_size` child
+        requests, grouped by child.
+
+        @param requests: the requests to send to each child device, by child id
+        @param timeout: optional time budget in seconds of each round trip, overriding
+        the client timeout
+        @return: the results of the requests of each child, by child id, in the same
+        order as the requests.
+        """
+        await self._initialize_protocol_if_needed()
+        operations = [
+            (child_id, request)
+            for child_id, child_requests in requests.items()
+            for request in child_requests
+        ]
+        results: dict[str, List[Try[Json]]] = {child_id: [] for child_id in requests}
+        batch_size = max(self.multi_request_batch_size, 1)
+        for start in range(0, len(operations), batch_size):
+            chunk = operations[start : start + batch_size]
+            by_child = [
+                (child_id, [request for _, request in child_operations])
+                for child_id, child_operations in itertools.groupby(
+                    chunk, key=lambda operation: operation[0]
+                )
+            ]
+            responses = await self._send_batch(
+                [
+                    _control_child_request(child_id, child_requests)
+                    for child_id, child_requests in by_child
+                ],
+                timeout,
+            )
+            for (child_id, child_requests), response in zip(by_child, responses):
+                results[child_id] += _split_child_responses(child_requests, response)
+        return results
+
     async def _set_device_info(self, device_info: Json) -> Try[bool]:
         response = await self.execute_raw_request(
             TapoRequest.set_device_info(device_info)
@@ -213,20 +551,126 @@ class TapoClient:
         return response.map(lambda _: True)
 
     async def _guess_protocol(self):
-        self._protocol = PassthroughProtocol(
+        """
+        Find the protocol spoken by the device, starting from the one remembered from
+        previous runs, if any. A device answering 1003 to a passthrough request speaks
+        KLAP; a device remembered as KLAP that stops working is probed again, so that
+        firmware updates switching protocol are followed.
+        """
+        klap_error: Optional[Exception] = None
+        if await self._remembered_protocol() == TapoProtocolType.KLAP:
+            self._protocol = self._create_protocol(TapoProtocolType.KLAP)
+            response = await self.get_component_negotiation()
+            if response.is_success():
+                return
+            logger.info("KLAP protocol not working, probing passthrough")
+            klap_error = response.error()
+            await self._protocol.close()
+
+        self._protocol = self._create_protocol(TapoProtocolType.PASSTHROUGH)
+        response = await self.get_component_negotiation()
+        if response.is_success():
+            await self._remember_protocol(TapoProtocolType.PASSTHROUGH)
+            return
+        error = response.error()
+        await self._protocol.close()
+        if not (isinstance(error, TapoException) and error.error_code == 1003):
+            self._protocol = None
+            raise klap_error or error
+
+        logger.info("Default protocol not working, fallback to KLAP ;)")
+        self._protocol = self._create_protocol(TapoProtocolType.KLAP)
+        await self._remember_protocol(TapoProtocolType.KLAP)
+        if klap_error is not None:
+            raise klap_error
+
+    def _create_protocol(
+        self, protocol_type: TapoProtocolType, login_version: Optional[int] = None
+    ) -> TapoProtocol:
+        if protocol_type == TapoProtocolType.KLAP:
+            return KlapProtocol(
+                auth_credential=self._auth_credential,
+                url=self._url,
+                http_session=self._http_session,
+                keep_alive=self._keep_alive,
+                transport=self._transport,
+                timeout=self._timeout,
+                session_store=self._session_store,
+            )
+        return PassthroughProtocol(
             auth_credential=self._auth_credential,
             url=self._url,
             http_session=self._http_session,
+            keep_alive=self._keep_alive,
+            transport=self._transport,
+            timeout=self._timeout,
+            session_store=self._session_store,
+            login_version=login_version,
         )
-        response = await self.get_component_negotiation()
-        if response.is_failure():
-            error = response.error()
-            if isinstance(error, TapoException) and error.error_code == 1003:
-                logger.info("Default protocol not working, fallback to KLAP ;)")
-                self._protocol = KlapProtocol(
-                    auth_credential=self._auth_credential,
-                    url=self._url,
-                    http_session=self._http_session,
-                )
-            else:
-                raise error
+
+    async def _remembered_protocol(self) -> Optional[TapoProtocolType]:
+        protocol_type = _device_protocols.get(self._device_key)
+        if protocol_type is None and self._session_store is not None:
+            capabilities = await async_load_capabilities(
+                self._session_store, self._device_key
+            )
+            name = capabilities.get("protocol")
+            if name in TapoProtocolType.__members__:
+                protocol_type = _device_protocols[self._device_key] = TapoProtocolType[
+                    name
+                ]
+        return protocol_type
+
+    async def _remember_protocol(self, protocol_type: TapoProtocolType):
+        _device_protocols[self._device_key] = protocol_type
+        if self._session_store is not None:
+            await async_save_capability(
+                self._session_store, self._device_key, "protocol", protocol_type.name
+            )
+
+
+def _is_error(response: Try[Any], error_codes: frozenset) -> bool:
+    error = response.error() if response.is_failure() else None
+    return isinstance(error, TapoException) and error.error_code in error_codes
+
+
+def _control_child_request(child_id: str, requests: List[TapoRequest]) -> TapoRequest:
+    multiple_request = TapoRequest.multiple_request(
+        MultipleRequestParams(requests)
+    ).with_request_time_millis(round(time() * 1000))
+    return TapoRequest.control_child(child_id, multiple_request)
+
+
+def _split_child_responses(
+    requests: List[TapoRequest], response: Try[Json]
+) -> List[Try[Json]]:
+    if response.is_failure():
+        return [response] * len(requests)
+    try:
+        child_response = TapoResponse.try_from_json(response.get()["responseData"])
+    except (KeyError, TypeError, AttributeError) as e:
+        return [Failure(e)] * len(requests)
+    if child_response.is_failure():
+        return [child_response] * len(requests)
+    return _split_multiple_responses(requests, child_response.get().result)
+
+
+def _split_multiple_responses(
+    requests: List[TapoRequest], result: Json
+) -> List[Try[Json]]:
+    # responses are matched by method, the device might not keep the request order
+    responses_by_method: dict[str, collections.deque] = {}
+    for response in result.get("responses", []):
+        responses_by_method.setdefault(
+            response.get("method"), collections.deque()
+        ).append(response)
+    results: List[Try[Json]] = []
+    for request in requests:
+        responses = responses_by_method.get(request.method)
+        if not responses:
+            results.append(Failure(Exception(f"No response to {request.method}")))
+        else:
+            results.append(
+                TapoResponse.try_from_json(responses.popleft()).map(lambda x: x.result)
+            )
+    return results
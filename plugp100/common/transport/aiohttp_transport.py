@@ -0,0 +1,56 @@
+import ssl
+from typing import Optional, Any
+
+import aiohttp
+
+from plugp100.common.transport.http_transport import HttpTransport, HttpResponse
+from plugp100.common.transport.tls import DeviceSSLContext
+from plugp100.common.utils.http_client import AsyncHttp
+
+
+class AiohttpTransport(HttpTransport):
+    """
+    Transport backed by aiohttp. HTTPS urls use `ssl_context`, by default a
+    `DeviceSSLContext` owned by this transport so TLS sessions are resumed per device.
+    """
+
+    def __init__(
+        self,
+        http_session: Optional[aiohttp.ClientSession] = None,
+        keep_alive: bool = False,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self._http = AsyncHttp(http_session, keep_alive=keep_alive)
+        self._ssl_context = ssl_context
+
+    async def post(
+        self,
+        url: str,
+        data: bytes,
+        headers: Optional[dict[str, str]] = None,
+        cookies: Optional[dict[str, str]] = None,
+        params: Optional[dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> HttpResponse:
+        response, body = await self._http.async_make_post_bytes(
+            url,
+            data=data,
+            cookies=cookies,
+            params=params,
+            headers=headers,
+            timeout=timeout,
+            ssl=self._get_ssl_context() if url.startswith("https") else None,
+        )
+        return HttpResponse(
+            status=response.status,
+            body=body,
+            cookies={name: cookie.value for name, cookie in response.cookies.items()},
+        )
+
+    async def close(self):
+        await self._http.close()
+
+    def _get_ssl_context(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            self._ssl_context = DeviceSSLContext()
+        return self._ssl_context
@@ -0,0 +1,39 @@
+import abc
+import dataclasses
+from typing import Any, Optional
+
+from plugp100.common.utils.json_utils import json_decode
+
+
+@dataclasses.dataclass
+class HttpResponse:
+    status: int
+    body: Optional[bytes]
+    cookies: dict[str, str]
+
+    def json(self) -> Any:
+        return json_decode(self.body)
+
+
+class HttpTransport(abc.ABC):
+    """
+    Sends HTTP POST requests to a single device. A transport can be closed and used
+    again: the next request opens a new connection. A `timeout` bounds the whole
+    exchange, raising `asyncio.TimeoutError` when exceeded.
+    """
+
+    @abc.abstractmethod
+    async def post(
+        self,
+        url: str,
+        data: bytes,
+        headers: Optional[dict[str, str]] = None,
+        cookies: Optional[dict[str, str]] = None,
+        params: Optional[dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> HttpResponse:
+        pass
+
+    @abc.abstractmethod
+    async def close(self):
+        pass
@@ -0,0 +1,170 @@
+import asyncio
+import functools
+import logging
+import ssl
+from http.cookies import SimpleCookie
+from typing import Optional, Any, Tuple
+from urllib.parse import urlsplit, urlencode
+
+from plugp100.common.transport.http_transport import HttpTransport, HttpResponse
+from plugp100.common.transport.tls import DeviceSSLContext
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class StreamTransport(HttpTransport):
+    """
+    Minimal HTTP/1.1 client built on asyncio streams, meant for the tiny bodies exchanged
+    with LAN devices. It keeps a single connection open and reuses it for every request;
+    replies must be framed by Content-Length or terminated by closing the connection.
+
+    HTTPS urls are served over TLS using `ssl_context`, by default a `DeviceSSLContext`
+    which resumes the TLS session when reconnecting.
+    """
+
+    def __init__(self, ssl_context: Optional[ssl.SSLContext] = None):
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._address: Optional[Tuple[str, str, int]] = None
+        self._ssl_context = ssl_context
+        self._lock = asyncio.Lock()
+
+    async def post(
+        self,
+        url: str,
+        data: bytes,
+        headers: Optional[dict[str, str]] = None,
+        cookies: Optional[dict[str, str]] = None,
+        params: Optional[dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> HttpResponse:
+        scheme, host, port, target = _split_url(url)
+        if params:
+            target = f"{target}{'&' if '?' in target else '?'}{urlencode(params)}"
+        head = [
+            f"POST {target} HTTP/1.1",
+            f"Host: {host}:{port}",
+            f"Content-Length: {len(data)}",
+        ]
+        if cookies:
+            head.append(
+                "Cookie: "
+                + "; ".join(f"{name}={value}" for name, value in cookies.items())
+            )
+        if headers:
+            head.extend(f"{name}: {value}" for name, value in headers.items())
+        request = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data
+        return await asyncio.wait_for(self._send((scheme, host, port), request), timeout)
+
+    async def close(self):
+        await self._disconnect()
+
+    async def _send(self, address: Tuple[str, str, int], request: bytes) -> HttpResponse:
+        async with self._lock:
+            reused = self._writer is not None and self._address == address
+            try:
+                try:
+                    return await self._exchange(address, request)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    await self._disconnect()
+                    # the device may have closed the idle connection, retry once on a
+                    # new one
+                    if not reused:
+                        raise
+                    logger.debug(
+                        "Connection to %s dropped (%s), reconnecting", address, e
+                    )
+                    return await self._exchange(address, request)
+            except BaseException:
+                # failed, timed out or cancelled mid-exchange: unread bytes may be left
+                # on the connection, which can't be used for the next request
+                self._abort()
+                raise
+
+    async def _exchange(
+        self, address: Tuple[str, str, int], request: bytes
+    ) -> HttpResponse:
+        if self._writer is None or self._address != address:
+            await self._disconnect()
+            scheme, host, port = address
+            self._reader, self._writer = await asyncio.open_connection(
+                host, port, ssl=self._get_ssl_context() if scheme == "https" else None
+            )
+            self._address = address
+
+        self._writer.write(request)
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by device")
+        status = _parse_status(status_line)
+        content_length: Optional[int] = None
+        keep_open = True
+        cookies = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            value = value.strip()
+            if name == "content-length":
+                if not value.isdigit():
+                    raise ValueError(f"Malformed Content-Length: {value!r}")
+                content_length = int(value)
+            elif name == "connection":
+                keep_open = value.lower() != "close"
+            elif name == "set-cookie":
+                cookies.update(
+                    {key: morsel.value for key, morsel in SimpleCookie(value).items()}
+                )
+            elif name == "transfer-encoding" and value.lower() == "chunked":
+                raise ValueError("Chunked responses are not supported")
+
+        if content_length is None:
+            body = await self._reader.read()
+            keep_open = False
+        else:
+            body = await self._reader.readexactly(content_length)
+        if not keep_open:
+            await self._disconnect()
+        return HttpResponse(status=status, body=body, cookies=cookies)
+
+    def _get_ssl_context(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            self._ssl_context = DeviceSSLContext()
+        return self._ssl_context
+
+    def _abort(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+
+    async def _disconnect(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+def _parse_status(status_line: bytes) -> int:
+    parts = status_line.split(b" ", 2)
+    if len(parts) < 2 or not parts[0].startswith(b"HTTP/") or not parts[1].isdigit():
+        raise ValueError(f"Malformed HTTP status line: {status_line!r}")
+    return int(parts[1])
+
+
+@functools.lru_cache(maxsize=256)
+def _split_url(url: str) -> Tuple[str, str, int, str]:
+    parts = urlsplit(url)
+    target = parts.path or "/"
+    if parts.query:
+        target = f"{target}?{parts.query}"
+    port = parts.port or _DEFAULT_PORTS[parts.scheme]
+    return parts.scheme, parts.hostname, port, target
@@ -0,0 +1,49 @@
+import ssl
+from typing import Optional
+
+
+class DeviceSSLContext(ssl.SSLContext):
+    """
+    SSL context meant to be used for a single device. Devices expose self-signed
+    certificates, so no verification is performed. Every new connection offers the TLS
+    session of the previous one, letting the device resume it instead of running a
+    full handshake on its slow CPU.
+    """
+
+    def __new__(cls):
+        context = super().__new__(cls, ssl.PROTOCOL_TLS_CLIENT)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def __init__(self):
+        super().__init__()
+        self._last_connection: Optional[ssl.SSLObject] = None
+        self._resumed = 0
+        self.handshakes = 0
+
+    @property
+    def resumed_handshakes(self) -> int:
+        last = self._last_connection
+        return self._resumed + (1 if last is not None and last.session_reused else 0)
+
+    def wrap_bio(
+        self, incoming, outgoing, server_side=False, server_hostname=None, session=None
+    ) -> ssl.SSLObject:
+        previous = self._last_connection
+        if previous is not None:
+            if previous.session_reused:
+                self._resumed += 1
+            if session is None and previous.session is not None:
+                session = previous.session
+        connection = super().wrap_bio(
+            incoming,
+            outgoing,
+            server_side=server_side,
+            server_hostname=server_hostname,
+            session=session,
+        )
+        if not server_side:
+            self._last_connection = connection
+            self.handshakes += 1
+        return connection
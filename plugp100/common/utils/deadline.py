@@ -0,0 +1,29 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    A time budget shared by every step of a request: handshake, login, retries and the
+    request itself each spend from the same budget.
+    """
+
+    def __init__(self, expire_at: Optional[float]):
+        self._expire_at = expire_at
+
+    @staticmethod
+    def after(timeout: Optional[float]) -> "Deadline":
+        return Deadline(None if timeout is None else time.monotonic() + timeout)
+
+    def remaining(self) -> Optional[float]:
+        """
+        Seconds left before the deadline, or None when there is no deadline.
+        Raise `asyncio.TimeoutError` once the deadline has passed.
+        """
+        if self._expire_at is None:
+            return None
+        remaining = self._expire_at - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError("Deadline exceeded")
+        return remaining
@@ -1,36 +1,202 @@
-from typing import Any
+import asyncio
+import logging
+import ssl as ssl_module
+import time
+import weakref
+from typing import Any, Optional, Tuple
 
 import aiohttp
 
+logger = logging.getLogger(__name__)
+
+# Max number of idle connections kept open towards a single device. Tapo devices
+# serve requests one at a time, so a couple of sockets is enough for a poller plus
+# an interactive caller.
+DEFAULT_LIMIT_PER_HOST = 2
+# Devices drop idle sockets quite aggressively, keep ours shorter than theirs.
+DEFAULT_KEEP_ALIVE_TIMEOUT = 10.0
+
 
 class AsyncHttp:
-    def __init__(self, session: aiohttp.ClientSession):
-        self.session = session
-        self.session.connector._force_close = True
+    """
+    Thin wrapper around an aiohttp session. Cookies are never read from or written to
+    the session cookie jar, they must be passed explicitly on each request. When the
+    session is shared between many devices it should be created with a
+    `DummyCookieJar`, like the ones returned by `create_session`.
+
+    Without an explicit session, the default session of the running event loop is
+    acquired on first use and released on `close`. A session supplied by the caller is
+    never closed nor reconfigured.
+    """
+
+    def __init__(
+        self, session: Optional[aiohttp.ClientSession] = None, keep_alive: bool = False
+    ):
+        self._session = session
+        self._owns_session = session is None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.keep_alive = keep_alive
         self.common_headers = {
             "Content-Type": "application/json",
             "requestByApp": "true",
             "Accept": "application/json",
         }
 
-    async def async_make_post(self, url, json: Any) -> aiohttp.ClientResponse:
-        self.session.cookie_jar.clear()
-        async with self.session.post(
-            url, json=json, headers=self.common_headers
-        ) as response:
-            return await self._force_read_release(response)
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = _acquire_default_session()
+            self._session_loop = asyncio.get_running_loop()
+        return self._session
+
+    @staticmethod
+    def create_session(
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+    ) -> aiohttp.ClientSession:
+        """
+        Create a session suited to talk with devices. Connections are pooled, with at most
+        `limit_per_host` sockets open towards each device; whether they are reused is
+        decided per request by the `keep_alive` flag of each `AsyncHttp`.
 
-    async def async_make_post_cookie(self, url, json, cookie) -> aiohttp.ClientResponse:
-        self.session.cookie_jar.clear()
-        async with self.session.post(
-            url, json=json, cookies=cookie, headers=self.common_headers
-        ) as response:
-            return await self._force_read_release(response)
+        The session never stores cookies: device cookies are always sent explicitly per
+        request, so the same session can be safely shared by any number of devices.
+        """
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=limit_per_host,
+            keepalive_timeout=DEFAULT_KEEP_ALIVE_TIMEOUT,
+        )
+        return aiohttp.ClientSession(
+            connector=connector, cookie_jar=aiohttp.DummyCookieJar()
+        )
+
+    async def async_make_post(
+        self, url, json: Any, timeout: Optional[float] = None
+    ) -> aiohttp.ClientResponse:
+        response, _ = await self._post(
+            url, timeout, json=json, headers=self.common_headers
+        )
+        return response
+
+    async def async_make_post_cookie(
+        self, url, json, cookie, timeout: Optional[float] = None
+    ) -> aiohttp.ClientResponse:
+        response, _ = await self._post(
+            url, timeout, json=json, cookies=cookie, headers=self.common_headers
+        )
+        return response
+
+    async def async_make_post_bytes(
+        self,
+        url,
+        data: bytes,
+        cookies=None,
+        params=None,
+        headers=None,
+        timeout: Optional[float] = None,
+        ssl: Optional[ssl_module.SSLContext] = None,
+    ) -> Tuple[aiohttp.ClientResponse, Optional[bytes]]:
+        kwargs = {} if ssl is None else {"ssl": ssl}
+        return await self._post(
+            url,
+            timeout,
+            data=data,
+            cookies=cookies,
+            params=params,
+            headers=headers,
+            **kwargs,
+        )
 
     async def close(self):
-        await self.session.close()
+        if self._owns_session and self._session is not None:
+            session, self._session = self._session, None
+            loop, self._session_loop = self._session_loop, None
+            if loop is asyncio.get_running_loop():
+                await _release_default_session(session)
+            elif loop.is_running():
+                logger.warning(
+                    "Closed from another event loop, releasing the default session on "
+                    "the loop which acquired it"
+                )
+                asyncio.run_coroutine_threadsafe(_release_default_session(session), loop)
+            else:
+                logger.warning(
+                    "Closed from another event loop, the default session of a loop no "
+                    "longer running is not released"
+                )
+
+    async def _post(
+        self, url, timeout: Optional[float], **kwargs
+    ) -> Tuple[aiohttp.ClientResponse, Optional[bytes]]:
+        started_at = time.monotonic()
+        try:
+            return await self._post_once(url, timeout, **kwargs)
+        except aiohttp.ClientConnectorError:
+            raise
+        except (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError) as e:
+            # a pooled connection may have been closed by the device while idle,
+            # in that case retry once on a brand-new connection.
+            if not self.keep_alive:
+                raise
+            logger.debug("Reused connection to %s dropped (%s), reconnecting", url, e)
+            if timeout is not None:
+                timeout -= time.monotonic() - started_at
+                if timeout <= 0:
+                    raise asyncio.TimeoutError() from e
+            return await self._post_once(url, timeout, **kwargs)
 
-    async def _force_read_release(self, response):
-        await response.read()
+    async def _post_once(
+        self, url, timeout: Optional[float], **kwargs
+    ) -> Tuple[aiohttp.ClientResponse, Optional[bytes]]:
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        if not self.keep_alive:
+            # ask for the connection to be dropped once the response is read, without
+            # touching the connector of a possibly shared session.
+            kwargs["headers"] = {
+                **(kwargs.get("headers") or {}),
+                aiohttp.hdrs.CONNECTION: "close",
+            }
+        async with self.session.post(url, **kwargs) as response:
+            return response, await self._force_read_release(response)
+
+    async def _force_read_release(self, response) -> Optional[bytes]:
+        try:
+            body = await response.read()
+        except Exception:
+            if response.status == 200:
+                raise
+            body = None
         await response.release()
-        return response
+        return body
+
+
+class _SharedSession:
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.references = 0
+
+
+_default_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _SharedSession]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _acquire_default_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    shared = _default_sessions.get(loop)
+    if shared is None or shared.session.closed:
+        shared = _default_sessions[loop] = _SharedSession(AsyncHttp.create_session())
+    shared.references += 1
+    return shared.session
+
+
+async def _release_default_session(session: aiohttp.ClientSession):
+    loop = asyncio.get_running_loop()
+    shared = _default_sessions.get(loop)
+    if shared is None or shared.session is not session:
+        return
+    shared.references -= 1
+    if shared.references <= 0:
+        del _default_sessions[loop]
+        await session.close()
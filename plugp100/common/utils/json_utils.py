@@ -1,8 +1,34 @@
 import dataclasses
-from typing import Any
+import json
+from typing import Any, Union
 
 Json = dict[str, Any]
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
 
 def dataclass_encode_json(obj):
     return {k: v for k, v in dataclasses.asdict(obj).items() if v is not None}
+
+
+def json_encode(value: Any) -> bytes:
+    """
+    Encode plain JSON values (dict, list, str, numbers, bool, None) to UTF-8 bytes.
+    Uses orjson when installed, which emits compact JSON, falling back to `json`.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # e.g. integers wider than 64 bit, which only the stdlib supports
+            pass
+    return json.dumps(value).encode("utf-8")
+
+
+def json_decode(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,61 @@
+import asyncio
+import dataclasses
+import time
+from typing import Optional
+
+
+@dataclasses.dataclass
+class LoopLagStats:
+    samples: int = 0
+    total_lag: float = 0.0
+    max_lag: float = 0.0
+    # samples which were late by more than the monitor threshold
+    late_samples: int = 0
+
+    @property
+    def mean_lag(self) -> float:
+        return self.total_lag / self.samples if self.samples else 0.0
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a task sleeping for `interval` seconds,
+    that is how long other callbacks, like inline cryptography, kept the loop busy.
+    """
+
+    def __init__(self, interval: float = 0.01, late_threshold: float = 0.05):
+        self._interval = interval
+        self._late_threshold = late_threshold
+        self._task: Optional[asyncio.Task] = None
+        self.stats = LoopLagStats()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, time.monotonic() - start - self._interval)
+            self.stats.samples += 1
+            self.stats.total_lag += lag
+            self.stats.max_lag = max(self.stats.max_lag, lag)
+            if lag > self._late_threshold:
+                self.stats.late_samples += 1
@@ -0,0 +1,44 @@
+import threading
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+BLOCK_SIZE = algorithms.AES.block_size // 8
+
+
+class AesCbc:
+    """
+    AES-CBC keeping a single encryption and decryption context for a key, so the key
+    schedule is expanded only once instead of for every message. Such contexts chain
+    each message to the last block of the previous one; this is undone by xor-ing the
+    first block with that block and the iv of the message. Data must be padded to the
+    block size.
+    """
+
+    def __init__(self, key: bytes):
+        cipher = Cipher(algorithms.AES(key), modes.CBC(bytes(BLOCK_SIZE)))
+        self._encryptor = cipher.encryptor()
+        self._decryptor = cipher.decryptor()
+        # last block chained by each context, zero until the first message
+        self._encryptor_chain = 0
+        self._decryptor_chain = 0
+        self._lock = threading.Lock()
+
+    def encrypt(self, padded: bytes, iv: int) -> bytes:
+        with self._lock:
+            first_block = int.from_bytes(padded[:BLOCK_SIZE], "big")
+            first_block ^= iv ^ self._encryptor_chain
+            encrypted = self._encryptor.update(
+                first_block.to_bytes(BLOCK_SIZE, "big") + padded[BLOCK_SIZE:]
+            )
+            self._encryptor_chain = int.from_bytes(encrypted[-BLOCK_SIZE:], "big")
+        return encrypted
+
+    def decrypt(self, data: bytes, iv: int) -> bytes:
+        if not data or len(data) % BLOCK_SIZE:
+            raise ValueError("The length of the provided data is not a multiple of 16.")
+        with self._lock:
+            decrypted = self._decryptor.update(data)
+            chain = self._decryptor_chain
+            self._decryptor_chain = int.from_bytes(data[-BLOCK_SIZE:], "big")
+        first_block = int.from_bytes(decrypted[:BLOCK_SIZE], "big") ^ chain ^ iv
+        return first_block.to_bytes(BLOCK_SIZE, "big") + decrypted[BLOCK_SIZE:]
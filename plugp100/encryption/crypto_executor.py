@@ -0,0 +1,63 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Optional, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class CryptoExecutor:
+    """
+    Runs CPU-bound cryptography on a thread pool, where OpenSSL releases the GIL, so a
+    burst of handshakes doesn't stall the I/O of every other device. Symmetric work on
+    payloads smaller than `offload_threshold` bytes still runs inline, since handing it
+    over to a thread costs more than doing it.
+    """
+
+    _default: Optional["CryptoExecutor"] = None
+
+    @staticmethod
+    def default() -> "CryptoExecutor":
+        """Process-wide executor used by transports and key pools unless given another."""
+        if CryptoExecutor._default is None:
+            CryptoExecutor._default = CryptoExecutor()
+        return CryptoExecutor._default
+
+    @staticmethod
+    def set_default(executor: "CryptoExecutor"):
+        CryptoExecutor._default = executor
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        offload_threshold: Optional[int] = 16 * 1024,
+        max_workers: int = 2,
+    ):
+        """
+        @param executor: where work is run, by default a pool of `max_workers` threads.
+        @param offload_threshold: payload size in bytes from which symmetric work is
+        offloaded, None to always run it inline.
+        """
+        self._executor = executor
+        self._max_workers = max_workers
+        self.offload_threshold = offload_threshold
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers, thread_name_prefix="plugp100-crypto"
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """Run expensive work, like RSA operations, on the executor."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(func, *args)
+        )
+
+    async def run_sized(self, size: int, func: Callable[..., T], *args) -> T:
+        """Run work over `size` bytes, offloading it only above the threshold."""
+        if self.offload_threshold is None or size < self.offload_threshold:
+            return func(*args)
+        return await self.run(func, *args)
@@ -12,3 +12,18 @@ def sha1(to_sha: str) -> str:
     sha1_algo = hashlib.sha1()
     sha1_algo.update(to_sha.encode("UTF-8"))
     return sha1_algo.hexdigest()
+
+
+def pkcs7_pad(data: bytes, block_size: int = 16) -> bytes:
+    padding_length = block_size - len(data) % block_size
+    return data + bytes((padding_length,)) * padding_length
+
+
+def pkcs7_unpad(data: bytes, block_size: int = 16) -> bytes:
+    padding_length = data[-1] if data else 0
+    if (
+        not 0 < padding_length <= block_size
+        or data[-padding_length:] != bytes((padding_length,)) * padding_length
+    ):
+        raise ValueError("Invalid padding bytes.")
+    return data[:-padding_length]
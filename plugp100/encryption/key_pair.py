@@ -1,4 +1,6 @@
 import base64
+from typing import Optional
+
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives import serialization
 
@@ -24,11 +26,26 @@ class KeyPair(object):
         return KeyPair(
             private_key=base64.b64encode(private_key_bytes).decode("UTF-8"),
             public_key=base64.b64encode(public_key_bytes).decode("UTF-8"),
+            rsa_private_key=private_key,
         )
 
-    def __init__(self, private_key: str, public_key: str):
+    def __init__(
+        self,
+        private_key: str,
+        public_key: str,
+        rsa_private_key: Optional[rsa.RSAPrivateKey] = None,
+    ):
         self.private_key = private_key
         self.public_key = public_key
+        self._rsa_private_key = rsa_private_key
+
+    def get_rsa_private_key(self) -> rsa.RSAPrivateKey:
+        """The private key object, decoded from DER only the first time."""
+        if self._rsa_private_key is None:
+            self._rsa_private_key = serialization.load_der_private_key(
+                base64.b64decode(self.private_key), None
+            )
+        return self._rsa_private_key
 
     def get_private_key(self) -> Base64str:
         return self.private_key
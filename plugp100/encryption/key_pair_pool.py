@@ -0,0 +1,93 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Optional
+
+from plugp100.encryption.crypto_executor import CryptoExecutor
+from plugp100.encryption.key_pair import KeyPair
+
+logger = logging.getLogger(__name__)
+
+
+class KeyPairPool:
+    """
+    RSA key pairs for passthrough handshakes, generated ahead of time on `executor`, by
+    default the one of `CryptoExecutor.default()`, so that taking one never blocks the
+    event loop. The pool is refilled in background
+    up to `size` key pairs every time one is taken.
+
+    With `reuse_for` set, the same key pair is handed out to every handshake for that
+    many seconds before moving to the next one, trading key freshness for less work.
+    """
+
+    _default: Optional["KeyPairPool"] = None
+
+    @staticmethod
+    def default() -> "KeyPairPool":
+        """Process-wide pool used by passthrough handshakes unless given another."""
+        if KeyPairPool._default is None:
+            KeyPairPool._default = KeyPairPool()
+        return KeyPairPool._default
+
+    @staticmethod
+    def set_default(pool: "KeyPairPool"):
+        KeyPairPool._default = pool
+
+    def __init__(
+        self,
+        size: int = 2,
+        key_size: int = 1024,
+        reuse_for: Optional[float] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self._size = size
+        self._key_size = key_size
+        self._reuse_for = reuse_for
+        self._executor = executor
+        self._ready: collections.deque[KeyPair] = collections.deque()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._shared: Optional[KeyPair] = None
+        self._shared_until = 0.0
+
+    async def acquire(self) -> KeyPair:
+        if self._shared is not None and time.monotonic() < self._shared_until:
+            return self._shared
+        try:
+            key_pair = self._ready.popleft()
+        except IndexError:
+            key_pair = await asyncio.wrap_future(self._generate())
+        self.fill()
+        if self._reuse_for is not None:
+            self._shared = key_pair
+            self._shared_until = time.monotonic() + self._reuse_for
+        return key_pair
+
+    def fill(self):
+        """Start generating key pairs until the pool is full."""
+        with self._lock:
+            missing = self._size - len(self._ready) - self._pending
+            self._pending += max(missing, 0)
+        for _ in range(missing):
+            self._generate().add_done_callback(self._on_generated)
+
+    def _generate(self) -> Future:
+        return self._get_executor().submit(KeyPair.create_key_pair, self._key_size)
+
+    def _on_generated(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.warning("Unable to generate key pair: %s", future.exception())
+        else:
+            self._ready.append(future.result())
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = CryptoExecutor.default().executor
+        return self._executor
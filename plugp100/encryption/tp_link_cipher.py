@@ -1,51 +1,45 @@
 import base64
 
-from cryptography.hazmat.primitives import padding
-from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import padding as asymmetric_padding
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
+from .aes_cbc import AesCbc
+from .helpers import pkcs7_pad, pkcs7_unpad
 from .key_pair import KeyPair
 
 
 class TpLinkCipher:
-    def encrypt(self, data) -> str:
+    def encrypt_bytes(self, data: bytes) -> bytes:
         pass
 
-    def decrypt(self, data) -> str:
+    def decrypt_bytes(self, data: bytes) -> bytes:
         pass
 
+    def encrypt(self, data: str) -> str:
+        return base64.b64encode(self.encrypt_bytes(data.encode("UTF-8"))).decode("UTF-8")
+
+    def decrypt(self, data: str) -> str:
+        return self.decrypt_bytes(base64.b64decode(data)).decode("UTF-8")
+
 
 class TpLinkCipherCryptography(TpLinkCipher):
     @staticmethod
     def create_from_keypair(handshake_key: str, keypair: KeyPair) -> "TpLinkCipher":
         handshake_key: bytes = base64.b64decode(handshake_key.encode("UTF-8"))
-        private_key_data = base64.b64decode(keypair.get_private_key().encode("UTF-8"))
-
-        private_key = serialization.load_der_private_key(private_key_data, None, None)
+        private_key = keypair.get_rsa_private_key()
         key_and_iv = private_key.decrypt(handshake_key, asymmetric_padding.PKCS1v15())
         if key_and_iv is None:
             raise ValueError("Decryption failed!")
 
         return TpLinkCipherCryptography(key_and_iv[:16], key_and_iv[16:])
 
-    def __init__(self, key, iv):
-        self.cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
-        self.padding_strategy = padding.PKCS7(algorithms.AES.block_size)
-
-    def encrypt(self, data) -> str:
-        encryptor = self.cipher.encryptor()
-        padder = self.padding_strategy.padder()
-        padded_data = padder.update(data.encode("UTF-8")) + padder.finalize()
-        encrypted = encryptor.update(padded_data) + encryptor.finalize()
-        return base64.b64encode(encrypted).decode("UTF-8")
-
-    def decrypt(self, data) -> str:
-        decryptor = self.cipher.decryptor()
-        unpadder = self.padding_strategy.unpadder()
-        decrypted = (
-            decryptor.update(base64.b64decode(data.encode("UTF-8")))
-            + decryptor.finalize()
-        )
-        unpadded_data = unpadder.update(decrypted) + unpadder.finalize()
-        return unpadded_data.decode("UTF-8")
+    def __init__(self, key: bytes, iv: bytes):
+        self.key = key
+        self.iv = iv
+        self._iv = int.from_bytes(iv, "big")
+        self._aes = AesCbc(key)
+
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        return self._aes.encrypt(pkcs7_pad(data), self._iv)
+
+    def decrypt_bytes(self, data: bytes) -> bytes:
+        return pkcs7_unpad(self._aes.decrypt(data, self._iv))
@@ -0,0 +1,178 @@
+import asyncio
+import contextlib
+import contextvars
+import dataclasses
+import enum
+import functools
+import heapq
+import itertools
+import threading
+import time
+from typing import Optional, AsyncIterator, Iterator, Callable
+
+
+class HandshakePriority(enum.IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+_priority: contextvars.ContextVar[HandshakePriority] = contextvars.ContextVar(
+    "handshake_priority", default=HandshakePriority.INTERACTIVE
+)
+
+
+@contextlib.contextmanager
+def handshake_priority(priority: HandshakePriority) -> Iterator[None]:
+    """
+    Give `priority` to the handshakes started by the requests made within, e.g.
+    `HandshakePriority.BACKGROUND` for periodic polls.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_handshake_priority() -> HandshakePriority:
+    """Priority given by `handshake_priority` to the handshakes started from here."""
+    return _priority.get()
+
+
+class HandshakeTicket:
+    """
+    The place of a handshake in the queue, whose priority can be raised while it
+    waits: when a request with higher priority ends up waiting for that handshake, e.g.
+    on the lock of a device whose session a background poll is renewing, the
+    handshake is admitted as if that request had started it.
+    """
+
+    def __init__(self, priority: Optional[HandshakePriority] = None):
+        self.priority = _priority.get() if priority is None else priority
+        self._requeue: Optional[Callable[[], None]] = None
+
+    def raise_priority(self, priority: HandshakePriority):
+        if priority < self.priority:
+            self.priority = priority
+            if self._requeue is not None:
+                self._requeue()
+
+
+@dataclasses.dataclass
+class HandshakeSchedulerStats:
+    admitted: int = 0
+    queued: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class HandshakeScheduler:
+    """
+    Caps the number of handshakes in progress across the process, so that a fleet of
+    devices starting together doesn't saturate the CPU and the access points, and the
+    devices become controllable one after another instead of all timing out together.
+    Queued handshakes are admitted by priority, then in arrival order.
+    """
+
+    _default: Optional["HandshakeScheduler"] = None
+
+    @staticmethod
+    def default() -> "HandshakeScheduler":
+        """Process-wide scheduler used by handshakes unless given another."""
+        if HandshakeScheduler._default is None:
+            HandshakeScheduler._default = HandshakeScheduler()
+        return HandshakeScheduler._default
+
+    @staticmethod
+    def set_default(scheduler: "HandshakeScheduler"):
+        HandshakeScheduler._default = scheduler
+
+    def __init__(self, max_concurrent: int = 8):
+        self._max_concurrent = max_concurrent
+        self._in_progress = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = HandshakeSchedulerStats()
+
+    @property
+    def in_progress(self) -> int:
+        return self._in_progress
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            # a handshake whose priority was raised is queued once per priority
+            return len(
+                {id(future) for _, _, future in self._waiters if not future.done()}
+            )
+
+    @contextlib.asynccontextmanager
+    async def slot(
+        self,
+        priority: Optional[HandshakePriority] = None,
+        timeout: Optional[float] = None,
+        ticket: Optional[HandshakeTicket] = None,
+    ) -> AsyncIterator[None]:
+        """
+        Wait, at most `timeout` seconds, for a handshake to be allowed, by default with
+        the priority given by `handshake_priority`, or with the priority of `ticket`
+        when given, which can be raised while waiting.
+        """
+        await self._acquire(ticket or HandshakeTicket(priority), timeout)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, ticket: HandshakeTicket, timeout: Optional[float]):
+        started = time.monotonic()
+        with self._lock:
+            if self._in_progress < self._max_concurrent and not self._waiters:
+                self._in_progress += 1
+                self.stats.admitted += 1
+                return
+            future = asyncio.get_running_loop().create_future()
+            arrival = next(self._arrivals)
+            heapq.heappush(self._waiters, (ticket.priority, arrival, future))
+            self.stats.queued += 1
+        ticket._requeue = functools.partial(self._requeue, ticket, arrival, future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # admitted just before giving up
+                self._release()
+            raise
+        finally:
+            ticket._requeue = None
+        waited = time.monotonic() - started
+        with self._lock:
+            self.stats.admitted += 1
+            self.stats.wait_seconds += waited
+            self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+
+    def _requeue(self, ticket: HandshakeTicket, arrival: int, future: asyncio.Future):
+        # the entry with the former priority stays, skipped once the future is done
+        with self._lock:
+            if not future.done():
+                heapq.heappush(self._waiters, (ticket.priority, arrival, future))
+
+    def _release(self):
+        with self._lock:
+            while self._waiters:
+                _, _, future = heapq.heappop(self._waiters)
+                if not future.done():
+                    break
+            else:
+                self._in_progress -= 1
+                return
+        # the slot passes to the waiter, possibly waiting on another event loop
+        future.get_loop().call_soon_threadsafe(self._admit, future)
+
+    def _admit(self, future: asyncio.Future):
+        if future.done():
+            # the waiter gave up meanwhile
+            self._release()
+        else:
+            future.set_result(None)
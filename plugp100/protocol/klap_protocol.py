@@ -1,83 +1,175 @@
+import asyncio
 import dataclasses
+import functools
 import hashlib
 import logging
 import secrets
+import threading
 import time
 from typing import Any, Optional, Tuple, Union
 
 import aiohttp
-import jsons
 import urllib3
-from aiohttp import ClientResponse
-from cryptography.hazmat.primitives import hashes, padding
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
 from plugp100.common.credentials import AuthCredential
 from plugp100.common.functional.tri import Try, Failure
+from plugp100.common.transport.aiohttp_transport import AiohttpTransport
+from plugp100.common.transport.http_transport import HttpTransport, HttpResponse
+from plugp100.common.utils.deadline import Deadline
+from plugp100.common.utils.json_utils import json_decode, Json
+from plugp100.encryption.aes_cbc import AesCbc
+from plugp100.encryption.crypto_executor import CryptoExecutor
+from plugp100.encryption.helpers import pkcs7_pad, pkcs7_unpad
+from plugp100.protocol.handshake_scheduler import (
+    HandshakeScheduler,
+    HandshakePriority,
+    HandshakeTicket,
+    current_handshake_priority,
+)
+from plugp100.protocol.session_store import SessionStore
 from plugp100.protocol.tapo_protocol import TapoProtocol
+from plugp100.requests.request_codec import dumps_request
 from plugp100.requests.tapo_request import TapoRequest
 from plugp100.responses.tapo_response import TapoResponse
 
 logger = logging.getLogger(__name__)
 
+_AUTH_VARIANT_CREDENTIAL = "configured"
+_AUTH_VARIANT_BLANK = "blank"
+_AUTH_VARIANT_KASA_SETUP = "kasa setup"
+
+# credentials variant which last matched the handshake1 challenge of each host
+_matched_auth_variants: dict[Tuple[str, str, Optional[int]], str] = {}
+
+
+@functools.lru_cache(maxsize=128)
+def _auth_hash(username: str, password: str) -> bytes:
+    # the whole fleet usually shares one credential, derive its hash once per process
+    return hashlib.sha256(
+        hashlib.sha1(username.encode()).digest()
+        + hashlib.sha1(password.encode()).digest()
+    ).digest()
+
 
 class KlapProtocol(TapoProtocol):
     TP_SESSION_COOKIE_NAME = "TP_SESSIONID"
     TP_TEST_USER = "test@tp-link.net"
     TP_TEST_PASSWORD = "test"
+    RENEWAL_RETRY_DELAY = 10.0
 
     def __init__(
         self,
         auth_credential: AuthCredential,
         url: str,
         http_session: Optional[aiohttp.ClientSession] = None,
+        keep_alive: bool = False,
+        transport: Optional[HttpTransport] = None,
+        timeout: Optional[float] = None,
+        session_renewal: bool = False,
+        session_store: Optional[SessionStore] = None,
+        crypto_executor: Optional[CryptoExecutor] = None,
+        handshake_scheduler: Optional[HandshakeScheduler] = None,
+        max_in_flight: int = 1,
     ):
+        """
+        @param session_renewal: when True, a background task performs a new handshake
+        shortly before the session expires and swaps it in, so that requests never
+        wait on a handshake while the device is reachable.
+        @param session_store: where the session is persisted, to be used again after a
+        restart while still valid.
+        @param crypto_executor: where the decryption of large responses runs, by
+        default the process-wide `CryptoExecutor.default()`.
+        @param handshake_scheduler: what admits handshakes, by default the process-wide
+        `HandshakeScheduler.default()`. Session renewals have background priority.
+        @param max_in_flight: how many requests are sent to the device at once, the
+        others wait their turn in arrival order. Sequence numbers are taken in that
+        order, so with the default of one the device sees them strictly increasing.
+        """
         super().__init__()
         self._base_url = url
+        self._timeout = timeout
         self._auth_credential = auth_credential
-        self._local_seed: Optional[bytes] = None
         self.local_auth_hash = self.generate_auth_hash(self._auth_credential)
-        self._http_session = (
-            aiohttp.ClientSession() if http_session is None else http_session
+        self._transport = (
+            AiohttpTransport(http_session, keep_alive=keep_alive)
+            if transport is None
+            else transport
         )
         self._klap_session: Optional[KlapSession] = None
+        self._session_renewal = session_renewal
+        self._renewal_task: Optional[asyncio.Task] = None
+        self._handshake_lock = asyncio.Lock()
+        # place in the scheduler queue of the handshake holding the lock, if any
+        self._handshake_ticket: Optional[HandshakeTicket] = None
+        self._request_lane = asyncio.Semaphore(max_in_flight)
+        self._crypto = crypto_executor or CryptoExecutor.default()
+        self._handshake_scheduler = handshake_scheduler or HandshakeScheduler.default()
+        self._session_store = session_store
+        self._session_store_key = f"klap:{url}"
+        self._session_restored = session_store is None
+        self.handshake_stats = HandshakeStats()
         self._host = urllib3.get_host(self._base_url)
 
     async def send_request(
-        self, request: TapoRequest, retry: int = 3
+        self, request: TapoRequest, retry: int = 3, timeout: Optional[float] = None
+    ) -> Try[TapoResponse[dict[str, Any]]]:
+        deadline = Deadline.after(self._timeout if timeout is None else timeout)
+        try:
+            return await self._send_with_retry(request, retry, deadline)
+        except asyncio.TimeoutError:
+            return Failure(
+                asyncio.TimeoutError(
+                    f"Request {request.method} to {self._base_url} timed out"
+                )
+            )
+
+    async def _send_with_retry(
+        self, request: TapoRequest, retry: int, deadline: Deadline
     ) -> Try[TapoResponse[dict[str, Any]]]:
-        response = await self._send_request(request, retry)
+        response = await self._send_request(request, retry, deadline)
         if response.is_failure() and retry > 0:
-            return await self.send_request(request, retry - 1)
+            return await self._send_with_retry(request, retry - 1, deadline)
         else:
             return response
 
     async def _send_request(
-        self, request: TapoRequest, retry: int = 1
+        self, request: TapoRequest, retry: int = 1, deadline: Deadline = Deadline(None)
     ) -> Try[TapoResponse[dict[str, Any]]]:
-        if self._klap_session is None or not self._klap_session.handshake_complete:
-            new_session = await self.perform_handshake()
-            if new_session.is_success():
-                self._klap_session = new_session.get()
-            else:
+        session = self._klap_session
+        if session is None and not self._session_restored:
+            session = await self._restore_session()
+        if not KlapSession.is_usable(session):
+            new_session = await self._blocking_handshake(deadline)
+            if new_session.is_failure():
                 return Failure(new_session.error())
+            session = new_session.get()
 
-        raw_request = jsons.dumps(request)
-        payload, seq = self._klap_session.chiper.encrypt(raw_request)
+        raw_request = dumps_request(request)
         url = f"{self._base_url}/request"
-        response, response_data = await self.session_post(
-            url,
-            params={"seq": seq},
-            data=payload,
-            cookies=self._klap_session.get_cookies(),
-        )
+        # the budget is checked before creating the coroutine, which would be left
+        # never awaited if it was already spent
+        remaining = deadline.remaining()
+        await asyncio.wait_for(self._request_lane.acquire(), remaining)
+        try:
+            if KlapSession.is_usable(self._klap_session):
+                # a session swapped in while waiting supersedes the one seen before
+                session = self._klap_session
+            payload, seq = session.chiper.encrypt(raw_request)
+            response, response_data = await self.session_post(
+                url,
+                params={"seq": seq},
+                data=payload,
+                cookies=session.get_cookies(),
+                timeout=deadline.remaining(),
+            )
+        finally:
+            self._request_lane.release()
         if response.status != 200:
             logger.error(
                 f"Query failed after succesful authentication at {time.time()}.  Host is {self._host}, Available attempts count is {retry}, Sequence is {seq}, Response status is {response.status}, Request was {request}"
             )
             if response.status == 403:
-                if self._klap_session is not None:
-                    self._klap_session.invalidate()
+                session.invalidate()
                 return Failure(Exception("Forbidden error after completing handshake"))
             else:
                 return Failure(
@@ -87,46 +179,165 @@ class KlapProtocol(TapoProtocol):
                     )
                 )
         else:
-            decrypted_response = jsons.loads(
-                self._klap_session.chiper.decrypt(response_data, seq)
+            decrypted_response = json_decode(
+                await self._crypto.run_sized(
+                    len(response_data), session.chiper.decrypt_bytes, response_data, seq
+                )
             )
             return TapoResponse.try_from_json(decrypted_response)
 
+    async def _blocking_handshake(self, deadline: Deadline) -> Try["KlapSession"]:
+        start = time.monotonic()
+        try:
+            if self._handshake_ticket is not None:
+                # waiting for that handshake, which mustn't wait at a lower priority
+                self._handshake_ticket.raise_priority(current_handshake_priority())
+            remaining = deadline.remaining()
+            await asyncio.wait_for(self._handshake_lock.acquire(), remaining)
+            try:
+                # concurrent requests wait for a single handshake and share its session
+                session = self._klap_session
+                if KlapSession.is_usable(session):
+                    return Try.of(session)
+                new_session = await self._perform_locked_handshake(
+                    HandshakeTicket(), deadline
+                )
+                self.handshake_stats.blocking_handshakes += 1
+                if new_session.is_success():
+                    await self._install_session(new_session.get())
+                return new_session
+            finally:
+                self._handshake_lock.release()
+        finally:
+            self.handshake_stats.blocking_handshake_seconds += time.monotonic() - start
+
+    async def _restore_session(self) -> Optional["KlapSession"]:
+        self._session_restored = True
+        stored = await self._session_store.async_load(self._session_store_key)
+        if stored is None:
+            return None
+        try:
+            session = KlapSession.from_json(stored)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("[KLAP] Ignoring stored session of %s: %s", self._host, e)
+            return None
+        if session.is_handshake_session_expired():
+            return None
+        logger.debug("[KLAP] Restored session with %s", self._host)
+        await self._install_session(session, persist=False)
+        return session
+
+    async def _install_session(self, session: "KlapSession", persist: bool = True):
+        self._klap_session = session
+        if self._session_renewal:
+            if self._renewal_task is not None:
+                self._renewal_task.cancel()
+            self._renewal_task = asyncio.get_running_loop().create_task(
+                self._renew_session(session)
+            )
+        if persist and self._session_store is not None:
+            await self._session_store.async_save(
+                self._session_store_key, session.to_json()
+            )
+
+    async def _renew_session(self, session: "KlapSession"):
+        delay = session.renewal_delay()
+        while True:
+            await asyncio.sleep(delay)
+            started = time.monotonic()
+            # bounded, as requests needing a handshake wait on the lock meanwhile
+            deadline = Deadline.after(self._timeout or KlapProtocol.RENEWAL_RETRY_DELAY)
+            async with self._handshake_lock:
+                try:
+                    new_session = await self._perform_locked_handshake(
+                        HandshakeTicket(HandshakePriority.BACKGROUND), deadline
+                    )
+                except Exception as e:
+                    # e.g. the device is briefly unreachable
+                    new_session = Failure(e)
+            self.handshake_stats.renewal_seconds += time.monotonic() - started
+            if new_session.is_success():
+                logger.debug("[KLAP] Renewed session with %s", self._host)
+                self.handshake_stats.renewals += 1
+                self._renewal_task = None
+                await self._install_session(new_session.get())
+                return
+            self.handshake_stats.failed_renewals += 1
+            logger.warning(
+                "[KLAP] Session renewal with %s failed: %s",
+                self._host,
+                new_session.error(),
+            )
+            if session.is_handshake_session_expired():
+                # the next request will handshake by itself
+                self._renewal_task = None
+                return
+            delay = KlapProtocol.RENEWAL_RETRY_DELAY
+
     async def close(self):
+        if self._renewal_task is not None:
+            self._renewal_task.cancel()
+            self._renewal_task = None
         if self._klap_session is not None:
+            if self._session_store is not None and self._klap_session.handshake_complete:
+                # the sequence number moved on since the handshake
+                await self._session_store.async_save(
+                    self._session_store_key, self._klap_session.to_json()
+                )
             self._klap_session.invalidate()
-        await self._http_session.close()
+        await self._transport.close()
+
+    async def _perform_locked_handshake(
+        self, ticket: HandshakeTicket, deadline: Deadline
+    ) -> Try["KlapSession"]:
+        # requests arriving meanwhile wait on the lock, and raise the ticket priority
+        self._handshake_ticket = ticket
+        try:
+            return await self.perform_handshake(deadline=deadline, ticket=ticket)
+        finally:
+            self._handshake_ticket = None
 
     async def perform_handshake(
-        self, new_local_seed: Optional[bytes] = None
+        self,
+        new_local_seed: Optional[bytes] = None,
+        deadline: Deadline = Deadline(None),
+        ticket: Optional[HandshakeTicket] = None,
     ) -> Try["KlapSession"]:
-        logger.debug("[KLAP] Starting handshake with %s", self._host)
-        seeds = await self.perform_handshake1(new_local_seed)
-        if seeds.is_success():
-            remote_seed, auth_hash = seeds.get()
+        """
+        Runs both handshake steps and returns the new session, without installing it:
+        requests keep using the current one until it is swapped.
+        """
+        local_seed = secrets.token_bytes(16) if new_local_seed is None else new_local_seed
+        async with self._handshake_scheduler.slot(
+            timeout=deadline.remaining(), ticket=ticket
+        ):
+            logger.debug("[KLAP] Starting handshake with %s", self._host)
+            handshake1 = await self.perform_handshake1(local_seed, deadline)
+            if handshake1.is_failure():
+                return Failure(handshake1.error())
+            pending_session, remote_seed, auth_hash = handshake1.get()
             session = await self.perform_handshake2(
-                self._local_seed, remote_seed, auth_hash
+                pending_session, local_seed, remote_seed, auth_hash, deadline
             )
-            if session.is_success():
-                logger.debug("[KLAP] Handshake with %s complete", self._host)
-            return session
-        return Failure(seeds.error())
+        if session.is_success():
+            logger.debug("[KLAP] Handshake with %s complete", self._host)
+        return session
 
     async def perform_handshake1(
-        self, new_local_seed: Optional[bytes] = None
-    ) -> Try[Tuple[bytes, bytes]]:
-        """Perform handshake1.  Resets authentication_failed to False at the start."""
-        self._local_seed = (
-            secrets.token_bytes(16) if new_local_seed is None else new_local_seed
-        )
+        self, local_seed: bytes, deadline: Deadline = Deadline(None)
+    ) -> Try[Tuple["KlapSession", bytes, bytes]]:
+        """
+        Perform handshake1, returning the pending session with the remote seed and the
+        auth hash which matched.
+        """
 
         # Handshake 1 has a payload of local_seed
         # and a response of 16 bytes, followed by sha256(clientBytes | authenticator)
-        self._klap_session = None
-
         url = f"{self._base_url}/handshake1"
 
-        response, response_data = await self.session_post(url, data=self._local_seed)
+        response, response_data = await self.session_post(
+            url, data=local_seed, timeout=deadline.remaining()
+        )
 
         if response.status != 200:
             return Failure(
@@ -135,17 +346,21 @@ class KlapProtocol(TapoProtocol):
                 )
             )
 
-        self._klap_session = KlapSession(
+        session = KlapSession(
             chiper=None,
             handshake_complete=False,
-            session_id=response.cookies.get(KlapProtocol.TP_SESSION_COOKIE_NAME).value,
+            session_id=response.cookies.get(KlapProtocol.TP_SESSION_COOKIE_NAME),
             expire_at=(time.time() * 1000)
-            + (int(response.cookies.get("TIMEOUT").value) * 1000),
+            + (int(response.cookies.get("TIMEOUT")) * 1000),
         )
         remote_seed = response_data[0:16]
         server_hash = response_data[16:]
         logger.debug(
-            f"Handshake1 posted at {time.time()}.  Host is {self._host}, Session cookie is {self._klap_session.session_id}, Response status is {response.status}, Request was {self.local_auth_hash.hex()}"
+            "Handshake1 posted at %s.  Host is %s, Session cookie is %s, Response status is %d",
+            time.time(),
+            self._host,
+            session.session_id,
+            response.status,
         )
         logger.debug(
             "Server remote_seed is: %s, server hash is: %s",
@@ -153,69 +368,57 @@ class KlapProtocol(TapoProtocol):
             server_hash.hex(),
         )
 
-        local_seed_auth_hash = KlapProtocol._sha256(
-            self._local_seed + remote_seed + self.local_auth_hash
-        )
-
-        if local_seed_auth_hash == server_hash:
-            logger.debug("handshake1 hashes match")
-            return Try.of((remote_seed, self.local_auth_hash))
-        else:
-            logger.debug(
-                "Expected %s got %s in handshake1.  Checking if blank auth is a match",
-                local_seed_auth_hash.hex(),
-                server_hash.hex(),
-            )
-            blank_auth = AuthCredential(username="", password="")
-            blank_auth_hash = self.generate_auth_hash(blank_auth)
-            blank_seed_auth_hash = KlapProtocol._sha256(
-                self._local_seed + remote_seed + blank_auth_hash
-            )
-            if blank_seed_auth_hash == server_hash:
-                logger.debug(
-                    "Server response doesn't match our expected hash on ip %s but an authentication with blank credentials matched"
-                    % self._host
-                )
-                return Try.of((remote_seed, blank_auth_hash))
-            else:
-                kasa_setup_auth = AuthCredential(
-                    KlapProtocol.TP_TEST_USER, KlapProtocol.TP_TEST_PASSWORD
-                )
-                kasa_setup_auth_hash = self.generate_auth_hash(kasa_setup_auth)
-                kasa_setup_seed_auth_hash = KlapProtocol._sha256(
-                    self._local_seed + remote_seed + kasa_setup_auth_hash
-                )
-                if kasa_setup_seed_auth_hash == server_hash:
-                    self.local_auth_hash = kasa_setup_auth_hash
+        seeds = local_seed + remote_seed
+        for variant, auth_hash in self._auth_variants_by_likelihood():
+            if KlapProtocol._sha256(seeds + auth_hash) == server_hash:
+                if variant != _AUTH_VARIANT_CREDENTIAL:
                     logger.debug(
-                        f"Server response doesn't match our expected hash on ip {self._host} but an authentication with kasa setup credentials matched"
-                    )
-                    return Try.of((remote_seed, kasa_setup_auth_hash))
-                else:
-                    self._klap_session = None
-                    logger.debug(
-                        f"Server response doesn't match our challenge on ip {self._host}"
-                    )
-                    return Failure(
-                        Exception(
-                            f"Server response doesn't match our challenge on ip {self._host}"
-                        )
+                        "Server response doesn't match our expected hash on ip %s but an authentication with %s credentials matched",
+                        self._host,
+                        variant,
                     )
+                _matched_auth_variants[self._host] = variant
+                return Try.of((session, remote_seed, auth_hash))
+
+        logger.debug("Server response doesn't match our challenge on ip %s", self._host)
+        return Failure(
+            Exception(f"Server response doesn't match our challenge on ip {self._host}")
+        )
+
+    def _auth_variants_by_likelihood(self) -> list[Tuple[str, bytes]]:
+        variants = [
+            (_AUTH_VARIANT_CREDENTIAL, self.local_auth_hash),
+            (_AUTH_VARIANT_BLANK, _auth_hash("", "")),
+            (
+                _AUTH_VARIANT_KASA_SETUP,
+                _auth_hash(KlapProtocol.TP_TEST_USER, KlapProtocol.TP_TEST_PASSWORD),
+            ),
+        ]
+        matched = _matched_auth_variants.get(self._host)
+        if matched is not None and matched != _AUTH_VARIANT_CREDENTIAL:
+            variants.sort(key=lambda variant: variant[0] != matched)
+        return variants
 
     async def perform_handshake2(
-        self, local_seed: bytes, remote_seed: bytes, auth_hash: bytes
+        self,
+        session: "KlapSession",
+        local_seed: bytes,
+        remote_seed: bytes,
+        auth_hash: bytes,
+        deadline: Deadline = Deadline(None),
     ) -> Try["KlapSession"]:
         url = f"{self._base_url}/handshake2"
         payload = self._sha256(remote_seed + local_seed + auth_hash)
         response, response_data = await self.session_post(
-            url, data=payload, cookies=self._klap_session.get_cookies()
+            url,
+            data=payload,
+            cookies=session.get_cookies(),
+            timeout=deadline.remaining(),
         )
         logger.debug(
             f"Handshake2 posted {time.time()}. Host is {self._host}, Response status is {response.status}, Request was {payload!r}"
         )
         if response.status != 200:
-            if self._klap_session is not None:
-                self._klap_session.invalidate()
             return Failure(
                 Exception("Device responded with %d to handshake2" % response.status)
             )
@@ -223,46 +426,38 @@ class KlapProtocol(TapoProtocol):
             chiper = KlapChiper(
                 local_seed=local_seed, remote_seed=remote_seed, user_hash=auth_hash
             )
-            return Try.of(self._klap_session.complete_handshake(chiper))
+            return Try.of(session.complete_handshake(chiper))
 
     @staticmethod
     def generate_auth_hash(auth: AuthCredential):
-        return KlapProtocol._sha256(
-            KlapProtocol._sha1(auth.username.encode())
-            + KlapProtocol._sha1(auth.password.encode())
-        )
+        return _auth_hash(auth.username, auth.password)
 
     @staticmethod
     def _sha1(payload: bytes) -> bytes:
-        digest = hashes.Hash(hashes.SHA1())
-        digest.update(payload)
-        return digest.finalize()
+        return hashlib.sha1(payload).digest()
 
     @staticmethod
     def _sha256(payload: bytes) -> bytes:
         return hashlib.sha256(payload).digest()
 
     async def session_post(
-        self, url: str, cookies=None, params=None, data=None
-    ) -> Tuple[ClientResponse, bytes]:
+        self, url: str, cookies=None, params=None, data=None, timeout=None
+    ) -> Tuple[HttpResponse, bytes]:
         """Send an http post request to the device."""
-        response_data = None
-        self._http_session.cookie_jar.clear()
-        resp = await self._http_session.post(
-            url, params=params, data=data, cookies=cookies
+        response = await self._transport.post(
+            url, data=data, cookies=cookies, params=params, timeout=timeout
         )
-        async with resp:
-            if resp.status == 200:
-                response_data = await resp.read()
-                await resp.release()
-            else:
-                try:
-                    response_data = await resp.read()
-                    await resp.release()
-                except Exception:
-                    pass
+        return response, response.body
 
-        return resp, response_data
+
+@dataclasses.dataclass
+class HandshakeStats:
+    renewals: int = 0
+    failed_renewals: int = 0
+    renewal_seconds: float = 0.0
+    # handshakes that requests had to wait for, and the time spent waiting
+    blocking_handshakes: int = 0
+    blocking_handshake_seconds: float = 0.0
 
 
 @dataclasses.dataclass
@@ -278,6 +473,19 @@ class KlapSession:
     def is_handshake_session_expired(self) -> bool:
         return (self.expire_at - (time.time() * 1000)) <= 40 * 1000
 
+    @staticmethod
+    def is_usable(session: Optional["KlapSession"]) -> bool:
+        return (
+            session is not None
+            and session.handshake_complete
+            and not session.is_handshake_session_expired()
+        )
+
+    def renewal_delay(self) -> float:
+        """Seconds to wait before renewing, well ahead of the expiration margin."""
+        remaining = self.expire_at / 1000 - time.time() - 40
+        return max(0.0, remaining - min(120.0, remaining / 2))
+
     def invalidate(self):
         self.session_id = None
         self.handshake_complete = False
@@ -290,42 +498,88 @@ class KlapSession:
             chiper=chiper,
         )
 
+    def to_json(self) -> Json:
+        return {
+            "session_id": self.session_id,
+            "expire_at": self.expire_at,
+            "chiper": self.chiper.state(),
+        }
+
+    @staticmethod
+    def from_json(data: Json) -> "KlapSession":
+        return KlapSession(
+            chiper=KlapChiper.from_state(data["chiper"]),
+            session_id=data["session_id"],
+            expire_at=data["expire_at"],
+            handshake_complete=True,
+        )
+
 
 class KlapChiper:
     def __init__(self, local_seed: bytes, remote_seed: bytes, user_hash: bytes):
-        self._key = self._key_derive(local_seed, remote_seed, user_hash)
-        (self._iv, self._seq) = self._iv_derive(local_seed, remote_seed, user_hash)
-        self._sig = self._sig_derive(local_seed, remote_seed, user_hash)
+        key = self._key_derive(local_seed, remote_seed, user_hash)
+        (iv, seq) = self._iv_derive(local_seed, remote_seed, user_hash)
+        sig = self._sig_derive(local_seed, remote_seed, user_hash)
+        self._init_state(key, iv, sig, seq)
 
-    def encrypt(self, msg: Union[str, bytes]):
+    @staticmethod
+    def from_state(state: Json) -> "KlapChiper":
+        """Rebuild the chiper of a session from its `state`."""
+        chiper = KlapChiper.__new__(KlapChiper)
+        chiper._init_state(
+            bytes.fromhex(state["key"]),
+            bytes.fromhex(state["iv"]),
+            bytes.fromhex(state["sig"]),
+            state["seq"],
+        )
+        return chiper
+
+    def state(self) -> Json:
+        """Derived keys and current sequence number, enough to resume the session."""
+        return {
+            "key": self._key.hex(),
+            "iv": self._iv.hex(),
+            "sig": self._sig.hex(),
+            "seq": self._seq,
+        }
+
+    def _init_state(self, key: bytes, iv: bytes, sig: bytes, seq: int):
+        self._key = key
+        self._iv = iv
+        self._sig = sig
+        self._seq = seq
+        self._seq_lock = threading.Lock()
+        # per session state: the key schedule, the iv without the sequence number as
+        # a block-sized int and the signature hash already fed with its prefix
+        self._aes = AesCbc(self._key)
+        self._iv_prefix = int.from_bytes(self._iv, "big") << 32
+        self._sig_hash = hashlib.sha256(self._sig)
+
+    def encrypt(self, msg: Union[str, bytes]) -> Tuple[bytes, int]:
         """Encrypt the data and increment the sequence number."""
-        self._seq = self._seq + 1
         if type(msg) == str:
             msg = msg.encode("utf-8")
-        assert type(msg) == bytes
-
-        cipher = Cipher(algorithms.AES(self._key), modes.CBC(self._iv_seq(self._seq)))
-        encryptor = cipher.encryptor()
-        padder = padding.PKCS7(128).padder()
-        padded_data = padder.update(msg) + padder.finalize()
-        ciphertext = encryptor.update(padded_data) + encryptor.finalize()
-
-        digest = hashes.Hash(hashes.SHA256())
-        digest.update(self._sig + self._seq.to_bytes(4, "big", signed=True) + ciphertext)
-        signature = digest.finalize()
+        with self._seq_lock:
+            self._seq = seq = self._seq + 1
+        return self._encrypt(msg, seq), seq
 
-        return signature + ciphertext, self._seq
-
-    def decrypt(self, msg: bytes, seq: int):
+    def decrypt(self, msg: bytes, seq: int) -> str:
         """Decrypt the data."""
-
-        cipher = Cipher(algorithms.AES(self._key), modes.CBC(self._iv_seq(seq)))
-        decryptor = cipher.decryptor()
-        dp = decryptor.update(msg[32:]) + decryptor.finalize()
-        unpadder = padding.PKCS7(128).unpadder()
-        plaintextbytes = unpadder.update(dp) + unpadder.finalize()
-
-        return plaintextbytes.decode()
+        return self.decrypt_bytes(msg, seq).decode()
+
+    def decrypt_bytes(self, msg: bytes, seq: int) -> bytes:
+        seq_bytes = seq.to_bytes(4, "big", signed=True)
+        iv = self._iv_prefix | int.from_bytes(seq_bytes, "big")
+        return pkcs7_unpad(self._aes.decrypt(msg[32:], iv))
+
+    def _encrypt(self, msg: bytes, seq: int) -> bytes:
+        seq_bytes = seq.to_bytes(4, "big", signed=True)
+        iv = self._iv_prefix | int.from_bytes(seq_bytes, "big")
+        ciphertext = self._aes.encrypt(pkcs7_pad(msg), iv)
+        digest = self._sig_hash.copy()
+        digest.update(seq_bytes)
+        digest.update(ciphertext)
+        return digest.digest() + ciphertext
 
     def _key_derive(self, local_seed, remote_seed, user_hash):
         payload = b"lsk" + local_seed + remote_seed + user_hash
@@ -343,8 +597,3 @@ class KlapChiper:
         # used to create a hash with which to prefix each request
         payload = b"ldk" + local_seed + remote_seed + user_hash
         return hashlib.sha256(payload).digest()[:28]
-
-    def _iv_seq(self, seq: int):
-        iv = self._iv + seq.to_bytes(4, "big", signed=True)
-        assert len(iv) == 16
-        return iv
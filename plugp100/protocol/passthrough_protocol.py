@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from time import time
 from typing import Optional, Any
@@ -5,12 +6,26 @@ from typing import Optional, Any
 import aiohttp
 
 from plugp100.common.credentials import AuthCredential
-from plugp100.common.functional.tri import Try
+from plugp100.common.functional.tri import Try, Failure
 from plugp100.protocol.securepassthrough_transport import (
     Session,
     SecurePassthroughTransport,
 )
-from plugp100.common.utils.http_client import AsyncHttp
+from plugp100.common.transport.aiohttp_transport import AiohttpTransport
+from plugp100.common.transport.http_transport import HttpTransport
+from plugp100.common.utils.deadline import Deadline
+from plugp100.encryption.crypto_executor import CryptoExecutor
+from plugp100.encryption.key_pair_pool import KeyPairPool
+from plugp100.protocol.handshake_scheduler import (
+    HandshakeScheduler,
+    HandshakeTicket,
+    current_handshake_priority,
+)
+from plugp100.protocol.session_store import (
+    SessionStore,
+    async_load_capabilities,
+    async_save_capability,
+)
 from plugp100.protocol.tapo_protocol import TapoProtocol
 from plugp100.requests.tapo_request import TapoRequest
 from plugp100.responses.tapo_exception import TapoException, TapoError
@@ -18,6 +33,9 @@ from plugp100.responses.tapo_response import TapoResponse
 
 logger = logging.getLogger(__name__)
 
+# whether each device accepted the v2 login the last time it logged in
+_login_v2_devices: dict[str, bool] = {}
+
 
 class PassthroughProtocol(TapoProtocol):
     def __init__(
@@ -25,59 +43,183 @@ class PassthroughProtocol(TapoProtocol):
         auth_credential: AuthCredential,
         url: str,
         http_session: Optional[aiohttp.ClientSession] = None,
+        keep_alive: bool = False,
+        transport: Optional[HttpTransport] = None,
+        timeout: Optional[float] = None,
+        session_store: Optional[SessionStore] = None,
+        key_pair_pool: Optional[KeyPairPool] = None,
+        crypto_executor: Optional[CryptoExecutor] = None,
+        login_version: Optional[int] = None,
+        handshake_scheduler: Optional[HandshakeScheduler] = None,
     ):
+        """
+        @param session_store: where the logged in session is persisted, to be used
+        again after a restart while still valid, along with the login version that the
+        device accepts.
+        @param key_pair_pool: where handshake key pairs are taken from, by default the
+        process-wide `KeyPairPool.default()`.
+        @param crypto_executor: where expensive cryptography runs, by default the
+        process-wide `CryptoExecutor.default()`.
+        @param login_version: the login version reported by discovery (`lv`), tried
+        first unless the device is already known to accept the other one.
+        @param handshake_scheduler: what admits handshakes, by default the process-wide
+        `HandshakeScheduler.default()`.
+        """
         super().__init__()
         self._url = url
-        self._http = AsyncHttp(
-            aiohttp.ClientSession() if http_session is None else http_session
+        self._timeout = timeout
+        self._transport = (
+            AiohttpTransport(http_session, keep_alive=keep_alive)
+            if transport is None
+            else transport
+        )
+        self._passthrough = SecurePassthroughTransport(
+            self._transport, key_pair_pool, crypto_executor, handshake_scheduler
         )
-        self._passthrough = SecurePassthroughTransport(self._http)
         self._session: Optional[Session] = None
         self._credential = auth_credential
+        self._session_store = session_store
+        self._session_store_key = f"passthrough:{url}"
+        self._session_restored = session_store is None
+        self._login_lock = asyncio.Lock()
+        # place in the scheduler queue of the login holding the lock, if any
+        self._login_ticket: Optional[HandshakeTicket] = None
+        self._login_version = login_version
 
     async def send_request(
-        self, request: TapoRequest, retry: int = 3
+        self, request: TapoRequest, retry: int = 3, timeout: Optional[float] = None
     ) -> Try[TapoResponse[dict[str, Any]]]:
-        response = await self._send_request(request)
+        deadline = Deadline.after(self._timeout if timeout is None else timeout)
+        try:
+            return await self._send_with_retry(request, retry, deadline)
+        except asyncio.TimeoutError:
+            return Failure(
+                asyncio.TimeoutError(f"Request {request.method} to {self._url} timed out")
+            )
+
+    async def _send_with_retry(
+        self, request: TapoRequest, retry: int, deadline: Deadline
+    ) -> Try[TapoResponse[dict[str, Any]]]:
+        response = await self._send_request(request, deadline)
         if retry > 0 and isinstance(response.error(), TapoException):
             if response.error().error_code == TapoError.ERR_SESSION_TIMEOUT.value:
-                self._session.invalidate()
                 logger.warning(
                     "Session timeout, invalidate it, retrying with new session"
                 )
-                return await self.send_request(request, retry - 1)
+                return await self._send_with_retry(request, retry - 1, deadline)
             elif response.error().error_code == TapoError.ERR_DEVICE.value:
-                self._session.invalidate()
                 logger.warning(
                     "Error device, probably exceeding rate limit, retrying with new session"
                 )
-                return await self.send_request(request, retry - 1)
+                return await self._send_with_retry(request, retry - 1, deadline)
         return response
 
     async def _send_request(
-        self, request: TapoRequest
+        self, request: TapoRequest, deadline: Deadline = Deadline(None)
     ) -> Try[TapoResponse[dict[str, Any]]]:
-        login_session = (
-            await self._login_with_version(self._credential)
-            if self._session is None or self._session.token is None
-            else Try.of(self._session)
+        if self._session is None and not self._session_restored:
+            self._session = await self._restore_session()
+        session = self._session
+        if session is None or session.token is None:
+            login_session = await self._login(deadline)
+            if login_session.is_failure():
+                return login_session
+            session = login_session.get()
+        request.with_terminal_uuid(session.terminal_uuid).with_request_time_millis(
+            round(time() * 1000)
         )
-        if login_session.is_success():
-            self._session = login_session.get()
-            request.with_terminal_uuid(
-                self._session.terminal_uuid
-            ).with_request_time_millis(round(time() * 1000))
-            return await self._passthrough.send(request, self._session)
-        return login_session
+        response = await self._passthrough.send(request, session, deadline.remaining())
+        if isinstance(
+            response.error(), TapoException
+        ) and response.error().error_code in (
+            TapoError.ERR_SESSION_TIMEOUT.value,
+            TapoError.ERR_DEVICE.value,
+        ):
+            # only the session used by this request, others may have logged in already
+            session.invalidate()
+        return response
+
+    async def _login(self, deadline: Deadline) -> Try[Session]:
+        if self._login_ticket is not None:
+            # waiting for that login, whose handshakes mustn't wait at a lower priority
+            self._login_ticket.raise_priority(current_handshake_priority())
+        remaining = deadline.remaining()
+        await asyncio.wait_for(self._login_lock.acquire(), remaining)
+        try:
+            # concurrent requests wait for a single login and share its session
+            session = self._session
+            if session is not None and session.token is not None:
+                return Try.of(session)
+            self._login_ticket = HandshakeTicket()
+            try:
+                login_session = await self._login_with_version(
+                    self._credential,
+                    is_trying_v2=await self._prefers_login_v2(),
+                    deadline=deadline,
+                    ticket=self._login_ticket,
+                )
+            finally:
+                self._login_ticket = None
+            if login_session.is_success():
+                self._session = login_session.get()
+                if self._session_store is not None:
+                    await self._session_store.async_save(
+                        self._session_store_key, self._session.to_json()
+                    )
+            return login_session
+        finally:
+            self._login_lock.release()
 
     async def close(self):
-        await self._http.close()
+        await self._transport.close()
         self._session = None
 
+    async def _restore_session(self) -> Optional[Session]:
+        self._session_restored = True
+        stored = await self._session_store.async_load(self._session_store_key)
+        if stored is None:
+            return None
+        try:
+            session = Session.from_json(stored)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Ignoring stored session of %s: %s", self._url, e)
+            return None
+        if session.token is None or session.is_handshake_session_expired():
+            return None
+        logger.debug("Restored session with %s", self._url)
+        return session
+
+    async def _prefers_login_v2(self) -> bool:
+        is_v2 = _login_v2_devices.get(self._url)
+        if is_v2 is not None:
+            return is_v2
+        if self._session_store is not None:
+            capabilities = await async_load_capabilities(self._session_store, self._url)
+            if "login_version" in capabilities:
+                # learned from a successful login
+                is_v2 = _login_v2_devices[self._url] = capabilities["login_version"] == 2
+                return is_v2
+        # only a guess, remembered once a login succeeds
+        return self._login_version == 2
+
+    async def _remember_login_version(self, is_v2: bool):
+        _login_v2_devices[self._url] = is_v2
+        if self._session_store is not None:
+            await async_save_capability(
+                self._session_store, self._url, "login_version", 2 if is_v2 else 1
+            )
+
     async def _login_with_version(
-        self, credential: AuthCredential, is_trying_v2: bool = False
+        self,
+        credential: AuthCredential,
+        is_trying_v2: bool = False,
+        deadline: Deadline = Deadline(None),
+        is_fallback: bool = False,
+        ticket: Optional[HandshakeTicket] = None,
     ) -> Try[Session]:
-        session_or_error = await self._passthrough.handshake(self._url)
+        session_or_error = await self._passthrough.handshake(
+            self._url, deadline.remaining(), ticket
+        )
         if session_or_error.is_failure():
             return session_or_error
         else:
@@ -85,17 +227,26 @@ class PassthroughProtocol(TapoProtocol):
             if not session.is_handshake_session_expired():
                 login_request = TapoRequest.login(credential, v2=is_trying_v2)
                 token_or_error = (
-                    await self._passthrough.send(login_request, session)
+                    await self._passthrough.send(
+                        login_request, session, deadline.remaining()
+                    )
                 ).map(lambda x: x.result["token"])
                 if token_or_error.is_success():
                     session.token = token_or_error.get()
+                    await self._remember_login_version(is_trying_v2)
                     return Try.of(session)
-                elif is_trying_v2 is False:
-                    return await self._login_with_version(credential, is_trying_v2=True)
-                else:  # already try with v2, so propagate error and stop retry
+                elif not is_fallback:
+                    return await self._login_with_version(
+                        credential,
+                        is_trying_v2=not is_trying_v2,
+                        deadline=deadline,
+                        is_fallback=True,
+                        ticket=ticket,
+                    )
+                else:  # already tried both versions, so propagate error and stop retry
                     return token_or_error
             else:
-                Try.of(
+                return Failure(
                     TapoException(
                         TapoError.ERR_SESSION_TIMEOUT,
                         "Detected handshake session timeout",
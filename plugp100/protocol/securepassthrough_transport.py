@@ -6,16 +6,18 @@ from dataclasses import dataclass
 from hashlib import md5
 from typing import Optional, Any
 
-import jsons
-
-from plugp100.common.functional.tri import Try
-from plugp100.common.utils.http_client import AsyncHttp
-from plugp100.common.utils.json_utils import Json
+from plugp100.common.functional.tri import Try, Failure
+from plugp100.common.transport.http_transport import HttpTransport
+from plugp100.common.utils.deadline import Deadline
+from plugp100.common.utils.json_utils import Json, json_decode
+from plugp100.encryption.crypto_executor import CryptoExecutor
 from plugp100.encryption.key_pair import KeyPair
+from plugp100.encryption.key_pair_pool import KeyPairPool
 from plugp100.encryption.tp_link_cipher import TpLinkCipher, TpLinkCipherCryptography
+from plugp100.protocol.handshake_scheduler import HandshakeScheduler, HandshakeTicket
 from plugp100.requests.handshake_params import HandshakeParams
 from plugp100.requests.internal.snowflake_id import SnowflakeId
-from plugp100.requests.secure_passthrough_params import SecurePassthroughParams
+from plugp100.requests.request_codec import dumps_request
 from plugp100.requests.tapo_request import TapoRequest
 from plugp100.responses.tapo_response import TapoResponse
 
@@ -23,7 +25,7 @@ from plugp100.responses.tapo_response import TapoResponse
 @dataclass
 class Session:
     url: str
-    key_pair: KeyPair
+    key_pair: Optional[KeyPair]
     chiper: TpLinkCipher
     session_id: str
     expire_at: float
@@ -44,39 +46,91 @@ class Session:
         self._handshake_invalid = True
         self.token = None
 
+    def to_json(self) -> Json:
+        return {
+            "url": self.url,
+            "key": self.chiper.key.hex(),
+            "iv": self.chiper.iv.hex(),
+            "session_id": self.session_id,
+            "expire_at": self.expire_at,
+            "token": self.token,
+            "terminal_uuid": self.terminal_uuid,
+        }
+
+    @staticmethod
+    def from_json(data: Json) -> "Session":
+        return Session(
+            url=data["url"],
+            key_pair=None,
+            chiper=TpLinkCipherCryptography(
+                bytes.fromhex(data["key"]), bytes.fromhex(data["iv"])
+            ),
+            session_id=data["session_id"],
+            expire_at=data["expire_at"],
+            token=data["token"],
+            terminal_uuid=data["terminal_uuid"],
+        )
+
 
 logger = logging.getLogger(__name__)
 
 
+_REQUEST_HEADERS = {
+    "Content-Type": "application/json",
+    "requestByApp": "true",
+    "Accept": "application/json",
+}
+
+
 class SecurePassthroughTransport:
-    def __init__(self, http: AsyncHttp):
-        self._http = http
+    def __init__(
+        self,
+        transport: HttpTransport,
+        key_pair_pool: Optional[KeyPairPool] = None,
+        crypto_executor: Optional[CryptoExecutor] = None,
+        handshake_scheduler: Optional[HandshakeScheduler] = None,
+    ):
+        self._transport = transport
+        self._key_pair_pool = key_pair_pool or KeyPairPool.default()
+        self._crypto = crypto_executor or CryptoExecutor.default()
+        self._handshake_scheduler = handshake_scheduler or HandshakeScheduler.default()
         self._request_id_generator = SnowflakeId(1, 1)
 
-    async def handshake(self, url: str) -> Try[Session]:
+    async def handshake(
+        self,
+        url: str,
+        timeout: Optional[float] = None,
+        ticket: Optional[HandshakeTicket] = None,
+    ) -> Try[Session]:
+        deadline = Deadline.after(timeout)
+        async with self._handshake_scheduler.slot(
+            timeout=deadline.remaining(), ticket=ticket
+        ):
+            return await self._handshake(url, deadline)
+
+    async def _handshake(self, url: str, deadline: Deadline) -> Try[Session]:
         logger.debug("Will perform handshaking...")
-        logger.debug("Generating keypair")
-
-        key_pair = KeyPair.create_key_pair()
+        key_pair = await self._key_pair_pool.acquire()
 
         handshake_params = HandshakeParams(key_pair.get_public_key())
-        logger.debug(f"Handshake params: {jsons.dumps(handshake_params)}")
-
         request = TapoRequest.handshake(handshake_params)
 
-        request_body = jsons.loads(jsons.dumps(request))
-        logger.debug(f"Request {request_body}")
+        request_body = dumps_request(request)
+        logger.debug("Request %s", request_body)
 
-        response = await self._http.async_make_post(url, json=request_body)
-        resp_dict = await response.json(content_type=None)
-        logger.debug(f"Device responded with: {resp_dict}")
+        response = await self._transport.post(
+            url,
+            request_body,
+            headers=_REQUEST_HEADERS,
+            timeout=deadline.remaining(),
+        )
+        resp_dict = response.json()
+        logger.debug("Device responded with: %s", resp_dict)
         response_or_error = TapoResponse.try_from_json(resp_dict).map(lambda _: True)
 
         if response_or_error.is_success():
-            handshake_cookies = {
-                cookie.key: cookie.value for cookie in response.cookies.values()
-            }
-            logger.debug(f"Got Handshake cookies: ...{handshake_cookies}")
+            handshake_cookies = response.cookies
+            logger.debug("Got Handshake cookies: ...%s", handshake_cookies)
             session_id = [
                 value for key, value in handshake_cookies.items() if "SESSIONID" in key
             ][0]
@@ -86,8 +140,8 @@ class SecurePassthroughTransport:
 
             logger.debug("Decoding handshake key...")
             handshake_key = resp_dict["result"]["key"]
-            tp_link_cipher = TpLinkCipherCryptography.create_from_keypair(
-                handshake_key, key_pair
+            tp_link_cipher = await self._crypto.run(
+                TpLinkCipherCryptography.create_from_keypair, handshake_key, key_pair
             )
 
             terminal_uuid = base64.b64encode(md5(uuid.uuid4().bytes).digest()).decode(
@@ -108,44 +162,60 @@ class SecurePassthroughTransport:
             return response_or_error
 
     async def send(
-        self, request: TapoRequest, session: Session
+        self, request: TapoRequest, session: Session, timeout: Optional[float] = None
     ) -> Try[TapoResponse[Json]]:
         request.with_request_id(
             self._request_id_generator.generate_id()
         ).with_request_time_millis(round(time.time() * 1000)).with_terminal_uuid(
             session.terminal_uuid
         )
-        raw_request = jsons.dumps(request)
-        logger.debug(f"Raw request: {raw_request}")
+        raw_request = dumps_request(request)
+        logger.debug("Raw request: %s", raw_request)
 
-        encrypted_request = session.chiper.encrypt(raw_request)
-        passthrough_request = TapoRequest.secure_passthrough(
-            SecurePassthroughParams(encrypted_request)
+        encrypted_request = base64.b64encode(
+            await self._crypto.run_sized(
+                len(raw_request), session.chiper.encrypt_bytes, raw_request
+            )
         )
-        request_body = jsons.loads(jsons.dumps(passthrough_request))
-        logger.debug(f"Request body: {request_body}")
+        request_body = _secure_passthrough_body(encrypted_request)
+        logger.debug("Request body: %s", request_body)
 
-        response_encrypted = await self._http.async_make_post_cookie(
+        response_encrypted = await self._transport.post(
             session.url
             if session.token is None
             else f"{session.url}?token={session.token}",
             request_body,
-            session.get_cookies(),
-        )
-        response_as_dict: dict = await response_encrypted.json(content_type=None)
-        logger.debug(f"Device responded with: {response_as_dict}")
-
-        response_json = (
-            TapoResponse.try_from_json(response_as_dict)
-            .map(
-                lambda response: jsons.loads(
-                    session.chiper.decrypt(response.result["response"])
-                )
-            )
-            .flat_map(
-                lambda decrypted_response: TapoResponse.try_from_json(decrypted_response)
-            )
+            headers=_REQUEST_HEADERS,
+            cookies=session.get_cookies(),
+            timeout=timeout,
         )
-        logger.debug(f"Decrypted response: {response_json}")
+        response_as_dict: dict = response_encrypted.json()
+        logger.debug("Device responded with: %s", response_as_dict)
+
+        response_json = await self._decrypt_response(response_as_dict, session)
+        logger.debug("Decrypted response: %s", response_json)
 
         return response_json
+
+    async def _decrypt_response(
+        self, response: dict[str, Any], session: Session
+    ) -> Try[TapoResponse[Json]]:
+        if response.get("error_code", -1) != 0:
+            return TapoResponse.try_from_json(response)
+        try:
+            encrypted = base64.b64decode(response["result"]["response"])
+            decrypted = await self._crypto.run_sized(
+                len(encrypted), session.chiper.decrypt_bytes, encrypted
+            )
+            return TapoResponse.try_from_json(json_decode(decrypted))
+        except Exception as e:
+            return Failure(e)
+
+
+def _secure_passthrough_body(encrypted_request: bytes) -> bytes:
+    # same document as TapoRequest.secure_passthrough, the base64 payload needs no
+    # escaping so it is spliced in directly instead of encoding a request object
+    return (
+        b'{"method": "securePassthrough", "params": {"request": "%s"}}'
+        % encrypted_request
+    )
@@ -0,0 +1,134 @@
+import abc
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Optional, Any
+
+from plugp100.common.utils.json_utils import Json
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(abc.ABC):
+    """
+    Keeps device sessions across restarts, so that the ones still valid are used again
+    instead of handshaking with every device at startup, together with what was learned
+    about each device (see `load_capabilities`). Entries are plain JSON dicts stored
+    under a key made of kind and device.
+
+    Protocols use `async_load` and `async_save`, which run `load` and `save` in the
+    default executor, so that stores doing I/O never block the event loop.
+    """
+
+    @abc.abstractmethod
+    def load(self, key: str) -> Optional[Json]:
+        pass
+
+    @abc.abstractmethod
+    def save(self, key: str, session: Json):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        pass
+
+    async def async_load(self, key: str) -> Optional[Json]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.load, key)
+
+    async def async_save(self, key: str, session: Json):
+        await asyncio.get_running_loop().run_in_executor(None, self.save, key, session)
+
+
+def load_capabilities(store: SessionStore, device: str) -> Json:
+    """Facts learned about `device`, like the login version it accepts."""
+    return store.load(f"capabilities:{device}") or {}
+
+
+def save_capability(store: SessionStore, device: str, name: str, value: Any):
+    capabilities = load_capabilities(store, device)
+    if capabilities.get(name) != value:
+        capabilities[name] = value
+        store.save(f"capabilities:{device}", capabilities)
+
+
+async def async_load_capabilities(store: SessionStore, device: str) -> Json:
+    return await store.async_load(f"capabilities:{device}") or {}
+
+
+async def async_save_capability(store: SessionStore, device: str, name: str, value: Any):
+    capabilities = await async_load_capabilities(store, device)
+    if capabilities.get(name) != value:
+        capabilities[name] = value
+        await store.async_save(f"capabilities:{device}", capabilities)
+
+
+class InMemorySessionStore(SessionStore):
+    def __init__(self):
+        self._sessions: dict[str, Json] = {}
+
+    def load(self, key: str) -> Optional[Json]:
+        return self._sessions.get(key)
+
+    def save(self, key: str, session: Json):
+        self._sessions[key] = session
+
+    def delete(self, key: str):
+        self._sessions.pop(key, None)
+
+    async def async_load(self, key: str) -> Optional[Json]:
+        # no I/O, not worth a trip to the executor
+        return self.load(key)
+
+    async def async_save(self, key: str, session: Json):
+        self.save(key, session)
+
+
+class FileSessionStore(SessionStore):
+    """
+    Stores each session in its own JSON file, readable by the current user only, in
+    `directory` (by default `plugp100/sessions` under the user cache directory).
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory or os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+            "plugp100",
+            "sessions",
+        )
+
+    def load(self, key: str) -> Optional[Json]:
+        try:
+            with open(self._path(key), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable session for %s: %s", key, e)
+            return None
+
+    def save(self, key: str, session: Json):
+        try:
+            os.makedirs(self._directory, mode=0o700, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(session, f)
+                os.replace(temp_path, self._path(key))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logger.warning("Unable to store session for %s: %s", key, e)
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._directory, f"{name}.json")
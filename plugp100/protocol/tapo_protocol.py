@@ -1,5 +1,5 @@
 import abc
-from typing import Any
+from typing import Any, Optional
 
 from plugp100.common.functional.tri import Try
 from plugp100.requests.tapo_request import TapoRequest
@@ -9,8 +9,13 @@ from plugp100.responses.tapo_response import TapoResponse
 class TapoProtocol(abc.ABC):
     @abc.abstractmethod
     async def send_request(
-        self, request: TapoRequest, retry: int = 3
+        self, request: TapoRequest, retry: int = 3, timeout: Optional[float] = None
     ) -> Try[TapoResponse[dict[str, Any]]]:
+        """
+        Send the request to the device. `timeout` is the total time budget in seconds,
+        shared by handshake, retries and the request itself; when None the protocol
+        default is used. On expiry a `Failure` holding `asyncio.TimeoutError` is returned.
+        """
         pass
 
     @abc.abstractmethod
@@ -0,0 +1,114 @@
+import dataclasses
+from typing import Any, Callable
+
+import jsons
+
+from plugp100.common.utils.json_utils import json_encode
+from plugp100.requests.handshake_params import HandshakeParams
+from plugp100.requests.login_device import LoginDeviceParams, LoginDeviceParamsV2
+from plugp100.requests.secure_passthrough_params import SecurePassthroughParams
+from plugp100.requests.set_device_info.play_alarm_params import PlayAlarmParams
+from plugp100.requests.set_device_info.set_light_color_info_params import (
+    LightColorDeviceInfoParams,
+)
+from plugp100.requests.set_device_info.set_light_info_params import (
+    LightDeviceInfoParams,
+)
+from plugp100.requests.set_device_info.set_plug_info_params import SetPlugInfoParams
+from plugp100.requests.set_device_info.set_trv_info_params import TRVDeviceInfoParams
+from plugp100.requests.tapo_request import (
+    TapoRequest,
+    ControlChildParams,
+    MultipleRequestParams,
+    PaginationParams,
+)
+from plugp100.requests.trigger_logs_params import GetTriggerLogsParams
+
+# Encoders turning request objects into plain JSON values, laid out exactly like jsons
+# does by reflection: object attributes sorted by name, None values kept, dicts in
+# insertion order. Values of any other type are delegated to jsons.
+_Encoder = Callable[[Any], Any]
+
+_PRIMITIVES = frozenset({str, int, float, bool, type(None)})
+
+# optional attributes are set by `with_request_id` & co., sorted like `dir()` does
+_TAPO_REQUEST_FIELDS = (
+    "method",
+    "params",
+    "requestID",
+    "request_time_milis",
+    "terminal_uuid",
+)
+_TAPO_REQUEST_FIELD_SET = frozenset(_TAPO_REQUEST_FIELDS)
+
+
+def encode_request(request: TapoRequest) -> dict[str, Any]:
+    """
+    Convert a request to the dict which is sent to the device, as `jsons.dump` would.
+    """
+    return _encode_value(request)
+
+
+def dumps_request(request: TapoRequest) -> bytes:
+    return json_encode(_encode_value(request))
+
+
+def _encode_value(value: Any) -> Any:
+    value_type = type(value)
+    if value_type in _PRIMITIVES:
+        return value
+    encoder = _ENCODERS.get(value_type)
+    if encoder is not None:
+        return encoder(value)
+    if value_type is dict:
+        return {key: _encode_value(item) for key, item in value.items()}
+    if value_type is list or value_type is tuple:
+        return [_encode_value(item) for item in value]
+    return jsons.dump(value)
+
+
+def _encode_tapo_request(request: TapoRequest) -> dict[str, Any]:
+    attributes = vars(request)
+    if not attributes.keys() <= _TAPO_REQUEST_FIELD_SET:
+        return jsons.dump(request)
+    return {
+        name: _encode_value(attributes[name])
+        for name in _TAPO_REQUEST_FIELDS
+        if name in attributes
+    }
+
+
+def _compile_encoder(*field_names: str) -> _Encoder:
+    names = tuple(sorted(field_names))
+
+    def encode(obj: Any) -> dict[str, Any]:
+        return {name: _encode_value(getattr(obj, name)) for name in names}
+
+    return encode
+
+
+def _compile_dataclass_encoder(cls: type) -> _Encoder:
+    return _compile_encoder(*(field.name for field in dataclasses.fields(cls)))
+
+
+_ENCODERS: dict[type, _Encoder] = {
+    TapoRequest: _encode_tapo_request,
+    LoginDeviceParams: _compile_encoder("username", "password"),
+    LoginDeviceParamsV2: _compile_encoder("username", "password2"),
+    **{
+        cls: _compile_dataclass_encoder(cls)
+        for cls in (
+            ControlChildParams,
+            MultipleRequestParams,
+            PaginationParams,
+            HandshakeParams,
+            SecurePassthroughParams,
+            GetTriggerLogsParams,
+            PlayAlarmParams,
+            LightColorDeviceInfoParams,
+            LightDeviceInfoParams,
+            SetPlugInfoParams,
+            TRVDeviceInfoParams,
+        )
+    },
+}
@@ -55,6 +55,7 @@ setup_args = dict(
     name="plugp100",
     version=get_version("plugp100/__init__.py"),
     install_requires=REQUIREMENTS,
+    extras_require={"speedups": ["orjson>=3.8"]},
     description="Controller for TP-Link Tapo P100 and other devices",
     long_description_content_type="text/markdown",
     long_description=README,
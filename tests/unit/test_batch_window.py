@@ -0,0 +1,73 @@
+import asyncio
+import unittest
+
+from plugp100.api.tapo_client import TapoClient
+from plugp100.common.credentials import AuthCredential
+from tests.unit.test_utils import TapoProtocolStub
+
+
+class BatchWindowTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self._device = TapoProtocolStub(
+            {
+                "get_device_info": {"device_on": True},
+                "get_energy_usage": {"today_energy": 10},
+                "get_current_power": {"current_power": 5},
+            }
+        )
+        self._client = TapoClient(
+            AuthCredential("", ""), url="", protocol=self._device, batch_window=0.005
+        )
+
+    async def test_should_merge_requests_made_within_window(self):
+        device_info, energy, power = await asyncio.gather(
+            self._client.get_device_info(),
+            self._client.get_energy_usage(),
+            self._client.get_current_power(),
+        )
+
+        self.assertEqual(["multipleRequest"], [it.method for it in self._device.sent])
+        self.assertEqual({"device_on": True}, device_info.get())
+        self.assertEqual(10, energy.get().today_energy)
+        self.assertEqual(5, power.get().current_power)
+
+    async def test_should_send_lone_request_as_is(self):
+        device_info = await self._client.get_device_info()
+        await asyncio.sleep(0.01)
+        power = await self._client.get_current_power()
+
+        self.assertEqual(
+            ["get_device_info", "get_current_power"],
+            [it.method for it in self._device.sent],
+        )
+        self.assertTrue(device_info.is_success() and power.is_success())
+
+    async def test_should_flush_full_batch_without_waiting(self):
+        self._client.multi_request_batch_size = 2
+        self._client._batch_window = 60
+
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                self._client.get_device_info(), self._client.get_current_power()
+            ),
+            1,
+        )
+
+        self.assertTrue(all(result.is_success() for result in results))
+        self.assertEqual(1, len(self._device.sent))
+
+    async def test_should_send_one_by_one_when_multiple_request_unsupported(self):
+        self._device.results["multipleRequest"] = -1002
+
+        first = await asyncio.gather(
+            self._client.get_device_info(), self._client.get_current_power()
+        )
+        second = await asyncio.gather(
+            self._client.get_device_info(), self._client.get_current_power()
+        )
+
+        self.assertTrue(all(result.is_success() for result in first + second))
+        self.assertEqual(
+            ["multipleRequest"] + ["get_device_info", "get_current_power"] * 2,
+            [it.method for it in self._device.sent],
+        )
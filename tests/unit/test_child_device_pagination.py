@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+
+from plugp100.api.tapo_client import TapoClient
+from plugp100.common.credentials import AuthCredential
+from plugp100.protocol.tapo_protocol import TapoProtocol
+from plugp100.responses.tapo_response import TapoResponse
+
+
+class _PagedChildrenProtocol(TapoProtocol):
+    """Hub with `total` children answered `page_size` at a time."""
+
+    def __init__(self, total: int, page_size: int):
+        self.children = [{"device_id": str(i)} for i in range(total)]
+        self._page_size = page_size
+        self.requested_indexes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_request(self, request, retry=3, timeout=None):
+        start_index = request.params.start_index
+        self.requested_indexes.append(start_index)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        result = {
+            "child_device_list": self.children[
+                start_index : start_index + self._page_size
+            ],
+            "start_index": start_index,
+            "sum": len(self.children),
+        }
+        return TapoResponse.try_from_json({"error_code": 0, "result": result})
+
+    async def close(self):
+        pass
+
+
+class ChildDevicePaginationTest(unittest.IsolatedAsyncioTestCase):
+    async def test_should_fetch_pages_concurrently_and_in_order(self):
+        protocol = _PagedChildrenProtocol(total=43, page_size=10)
+        client = TapoClient(AuthCredential("", ""), url="", protocol=protocol)
+
+        children = (await client.get_child_device_list(fan_out=2)).get_or_raise()
+
+        self.assertEqual(protocol.children, children.child_device_list)
+        self.assertEqual(43, children.sum)
+        self.assertEqual([0, 10, 20, 30, 40], protocol.requested_indexes)
+        self.assertEqual(2, protocol.max_in_flight)
+
+    async def test_should_fetch_pages_in_parallel_with_batch_window(self):
+        protocol = _PagedChildrenProtocol(total=43, page_size=10)
+        client = TapoClient(
+            AuthCredential("", ""), url="", protocol=protocol, batch_window=0.005
+        )
+
+        children = (await client.get_child_device_list(fan_out=4)).get_or_raise()
+
+        self.assertEqual(protocol.children, children.child_device_list)
+        self.assertEqual(4, protocol.max_in_flight)
+
+    async def test_should_fetch_only_first_page(self):
+        protocol = _PagedChildrenProtocol(total=43, page_size=10)
+        client = TapoClient(AuthCredential("", ""), url="", protocol=protocol)
+
+        children = (await client.get_child_device_list(all_pages=False)).get_or_raise()
+
+        self.assertEqual(protocol.children[:10], children.child_device_list)
+        self.assertEqual([0], protocol.requested_indexes)
+
+    async def test_should_stream_parsed_children(self):
+        protocol = _PagedChildrenProtocol(total=43, page_size=10)
+        client = TapoClient(AuthCredential("", ""), url="", protocol=protocol)
+
+        device_ids = [
+            device_id
+            async for device_id in client.iter_child_devices(
+                parse=lambda x: x["device_id"]
+            )
+        ]
+
+        self.assertEqual([str(i) for i in range(43)], device_ids)
+
+    async def test_should_stop_requesting_pages_when_iteration_stops(self):
+        protocol = _PagedChildrenProtocol(total=100, page_size=10)
+        client = TapoClient(AuthCredential("", ""), url="", protocol=protocol)
+
+        children = client.iter_child_devices(fan_out=2)
+        first = await children.__anext__()
+        await children.aclose()
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(protocol.children[0], first)
+        self.assertEqual([0, 10, 20], protocol.requested_indexes)
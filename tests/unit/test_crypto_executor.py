@@ -0,0 +1,30 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from plugp100.common.utils.loop_lag import LoopLagMonitor
+from plugp100.encryption.crypto_executor import CryptoExecutor
+
+
+class CryptoExecutorTest(unittest.IsolatedAsyncioTestCase):
+    async def test_should_offload_only_payloads_above_threshold(self):
+        crypto = CryptoExecutor(offload_threshold=1024)
+        loop_thread = threading.current_thread()
+
+        small = await crypto.run_sized(10, threading.current_thread)
+        large = await crypto.run_sized(4096, threading.current_thread)
+        always = await crypto.run(threading.current_thread)
+
+        self.assertIs(loop_thread, small)
+        self.assertIsNot(loop_thread, large)
+        self.assertIsNot(loop_thread, always)
+
+    async def test_loop_lag_monitor_should_record_blocking_work(self):
+        async with LoopLagMonitor(interval=0.001, late_threshold=0.02) as monitor:
+            await asyncio.sleep(0.01)
+            time.sleep(0.05)
+            await asyncio.sleep(0.01)
+
+        self.assertGreaterEqual(monitor.stats.max_lag, 0.03)
+        self.assertGreaterEqual(monitor.stats.late_samples, 1)
@@ -0,0 +1,233 @@
+import asyncio
+import gc
+import time
+import unittest
+import warnings
+from unittest.mock import AsyncMock, MagicMock
+
+from plugp100.api.tapo_client import TapoClient
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.functional.tri import Success
+from plugp100.common.transport.http_transport import HttpResponse
+from plugp100.common.utils.deadline import Deadline
+from plugp100.protocol.klap_protocol import KlapProtocol
+from plugp100.protocol.passthrough_protocol import PassthroughProtocol
+from plugp100.requests.tapo_request import TapoRequest
+from plugp100.responses.tapo_response import TapoResponse
+from tests.unit.test_utils import KlapDeviceStub, TapoProtocolStub
+
+_CREDENTIAL = AuthCredential("user@mail.com", "password")
+_URL = "http://127.0.0.1/app"
+
+
+class _SlowKlapDevice(KlapDeviceStub):
+    """KLAP device taking `delay` seconds to answer, failing requests when asked."""
+
+    def __init__(self, credential: AuthCredential, delay: float):
+        super().__init__(credential)
+        self.delay = delay
+        self.failing_requests = False
+
+    async def post(
+        self, url, data, headers=None, cookies=None, params=None, timeout=None
+    ):
+        await asyncio.wait_for(asyncio.sleep(self.delay), timeout)
+        if self.failing_requests and url.endswith("/request"):
+            self.requests += 1
+            return HttpResponse(status=500, body=b"", cookies={})
+        return await super().post(url, data, headers, cookies, params, timeout)
+
+
+_EXPIRED = Deadline(0)
+
+
+class _NeverAwaitedWarnings:
+    """Collects the coroutines garbage collected without ever being awaited."""
+
+    def __enter__(self) -> list:
+        self._catcher = warnings.catch_warnings(record=True)
+        self._warnings = self._catcher.__enter__()
+        warnings.simplefilter("always")
+        self.never_awaited = []
+        return self.never_awaited
+
+    def __exit__(self, *exc_info):
+        gc.collect()
+        self._catcher.__exit__(*exc_info)
+        self.never_awaited += [
+            str(it.message) for it in self._warnings if "never awaited" in str(it.message)
+        ]
+
+
+class KlapDeadlineTest(unittest.IsolatedAsyncioTestCase):
+    async def test_handshake_and_request_should_share_budget(self):
+        device = _SlowKlapDevice(_CREDENTIAL, delay=0.04)
+        protocol = KlapProtocol(_CREDENTIAL, _URL, transport=device)
+
+        # handshake1, handshake2 and the request take 0.12s together
+        started = time.monotonic()
+        response = await protocol.send_request(TapoRequest.get_device_info(), timeout=0.1)
+
+        self.assertIsInstance(response.error(), asyncio.TimeoutError)
+        self.assertLess(time.monotonic() - started, 0.2)
+        self.assertTrue(
+            (
+                await protocol.send_request(TapoRequest.get_device_info(), timeout=1)
+            ).is_success()
+        )
+
+    async def test_retries_should_share_budget(self):
+        device = _SlowKlapDevice(_CREDENTIAL, delay=0.02)
+        protocol = KlapProtocol(_CREDENTIAL, _URL, transport=device)
+        await protocol.send_request(TapoRequest.get_device_info())
+        device.failing_requests = True
+        device.requests = 0
+
+        started = time.monotonic()
+        response = await protocol.send_request(
+            TapoRequest.get_device_info(), retry=10, timeout=0.07
+        )
+
+        self.assertIsInstance(response.error(), asyncio.TimeoutError)
+        self.assertLess(time.monotonic() - started, 0.15)
+        self.assertLessEqual(device.requests, 4)
+
+    async def test_waiting_for_handshake_lock_should_spend_budget(self):
+        protocol = KlapProtocol(
+            _CREDENTIAL, _URL, transport=_SlowKlapDevice(_CREDENTIAL, 0)
+        )
+
+        async with protocol._handshake_lock:
+            started = time.monotonic()
+            response = await protocol.send_request(
+                TapoRequest.get_device_info(), timeout=0.05
+            )
+
+        self.assertIsInstance(response.error(), asyncio.TimeoutError)
+        self.assertLess(time.monotonic() - started, 0.15)
+
+    async def test_waiting_for_request_lane_should_spend_budget(self):
+        protocol = KlapProtocol(
+            _CREDENTIAL, _URL, transport=_SlowKlapDevice(_CREDENTIAL, 0)
+        )
+        await protocol.send_request(TapoRequest.get_device_info())
+
+        async with protocol._request_lane:
+            started = time.monotonic()
+            response = await protocol.send_request(
+                TapoRequest.get_device_info(), timeout=0.05
+            )
+
+        self.assertIsInstance(response.error(), asyncio.TimeoutError)
+        self.assertLess(time.monotonic() - started, 0.15)
+
+    async def test_spent_budget_should_not_leave_lane_acquire_pending(self):
+        protocol = KlapProtocol(
+            _CREDENTIAL, _URL, transport=_SlowKlapDevice(_CREDENTIAL, 0)
+        )
+        await protocol.send_request(TapoRequest.get_device_info())
+
+        with _NeverAwaitedWarnings() as never_awaited:
+            with self.assertRaises(asyncio.TimeoutError):
+                await protocol._send_request(
+                    TapoRequest.get_device_info(), deadline=_EXPIRED
+                )
+
+        self.assertEqual([], never_awaited)
+
+    async def test_spent_budget_should_not_leave_handshake_lock_acquire_pending(self):
+        protocol = KlapProtocol(
+            _CREDENTIAL, _URL, transport=_SlowKlapDevice(_CREDENTIAL, 0)
+        )
+
+        with _NeverAwaitedWarnings() as never_awaited:
+            with self.assertRaises(asyncio.TimeoutError):
+                await protocol._blocking_handshake(_EXPIRED)
+
+        self.assertEqual([], never_awaited)
+
+
+class PassthroughDeadlineTest(unittest.IsolatedAsyncioTestCase):
+    def _protocol(self, delay: float, error_code: int = 0) -> PassthroughProtocol:
+        """Protocol whose device takes `delay` seconds for every exchange."""
+        protocol = PassthroughProtocol(_CREDENTIAL, _URL)
+
+        async def handshake(url, timeout=None, ticket=None):
+            await asyncio.wait_for(asyncio.sleep(delay), timeout)
+            return Success(
+                MagicMock(token=None, is_handshake_session_expired=lambda: False)
+            )
+
+        async def send(request, session, timeout=None):
+            await asyncio.wait_for(asyncio.sleep(delay), timeout)
+            if request.method == "login_device":
+                return TapoResponse.try_from_json(
+                    {"error_code": 0, "result": {"token": "token"}}
+                )
+            return TapoResponse.try_from_json({"error_code": error_code, "result": {}})
+
+        protocol._passthrough.handshake = AsyncMock(side_effect=handshake)
+        protocol._passthrough.send = AsyncMock(side_effect=send)
+        return protocol
+
+    async def test_login_and_request_should_share_budget(self):
+        protocol = self._protocol(delay=0.04)
+
+        started = time.monotonic()
+        response = await protocol.send_request(TapoRequest.get_device_info(), timeout=0.1)
+
+        self.assertIsInstance(response.error(), asyncio.TimeoutError)
+        self.assertLess(time.monotonic() - started, 0.2)
+
+    async def test_retries_should_share_budget(self):
+        # session timeout on every request, so that each retry logs in again
+        protocol = self._protocol(delay=0.02, error_code=9999)
+
+        started = time.monotonic()
+        response = await protocol.send_request(
+            TapoRequest.get_device_info(), retry=10, timeout=0.15
+        )
+
+        self.assertIsInstance(response.error(), asyncio.TimeoutError)
+        self.assertLess(time.monotonic() - started, 0.2)
+        self.assertLessEqual(protocol._passthrough.send.await_count, 8)
+
+    async def test_waiting_for_login_lock_should_spend_budget(self):
+        protocol = self._protocol(delay=0)
+
+        async with protocol._login_lock:
+            started = time.monotonic()
+            response = await protocol.send_request(
+                TapoRequest.get_device_info(), timeout=0.05
+            )
+
+        self.assertIsInstance(response.error(), asyncio.TimeoutError)
+        self.assertLess(time.monotonic() - started, 0.15)
+
+    async def test_spent_budget_should_not_leave_login_lock_acquire_pending(self):
+        protocol = self._protocol(delay=0)
+
+        with _NeverAwaitedWarnings() as never_awaited:
+            with self.assertRaises(asyncio.TimeoutError):
+                await protocol._login(_EXPIRED)
+
+        self.assertEqual([], never_awaited)
+
+
+class _ProtocolWithoutTimeout(TapoProtocolStub):
+    """Protocol implemented before `send_request` took a timeout."""
+
+    async def send_request(self, request, retry=3):
+        return await super().send_request(request, retry)
+
+
+class TapoClientTimeoutTest(unittest.IsolatedAsyncioTestCase):
+    async def test_should_not_pass_timeout_unless_given(self):
+        protocol = _ProtocolWithoutTimeout({"get_device_info": {"device_on": True}})
+        client = TapoClient(_CREDENTIAL, url="", protocol=protocol)
+
+        self.assertTrue((await client.get_device_info()).is_success())
+        results = await client.execute_many([TapoRequest.get_device_info()] * 2)
+        self.assertTrue(all(result.is_success() for result in results))
+        child = await client.control_child("child", TapoRequest.get_device_info())
+        self.assertEqual({"device_on": True}, child.get())
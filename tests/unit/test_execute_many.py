@@ -0,0 +1,126 @@
+import unittest
+
+from plugp100.api.tapo_client import TapoClient
+from plugp100.common.credentials import AuthCredential
+from plugp100.discovery.discovered_device import DiscoveredDevice, EncryptionScheme
+from plugp100.requests.tapo_request import TapoRequest
+from plugp100.responses.tapo_exception import TapoException
+from plugp100.responses.tapo_response import TapoResponse
+from tests.unit.test_utils import TapoProtocolStub
+
+
+class _FailingOnceProtocol(TapoProtocolStub):
+    """Device answering the first `method` request with a transient error."""
+
+    def __init__(self, method: str, results):
+        super().__init__(results)
+        self._failing_method = method
+
+    def _answer(self, request):
+        if request.method == self._failing_method:
+            self._failing_method = None
+            return {"error_code": -1001}
+        return super()._answer(request)
+
+
+class _LimitedBatchProtocol(TapoProtocolStub):
+    """Device rejecting any multipleRequest of more than `limit` requests."""
+
+    def __init__(self, limit: int, results):
+        super().__init__(results)
+        self._limit = limit
+
+    async def send_request(self, request, retry=3, timeout=None):
+        if (
+            request.method == "multipleRequest"
+            and len(request.params.requests) > self._limit
+        ):
+            self.sent.append(request)
+            return TapoResponse.try_from_json({"error_code": -1006})
+        return await super().send_request(request, retry, timeout)
+
+
+class ExecuteManyTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self._device = TapoProtocolStub(
+            {
+                "get_device_info": {"device_on": True},
+                "get_energy_usage": {"today_energy": 10},
+                "get_current_power": {"current_power": 5},
+                "get_device_usage": -1008,
+            }
+        )
+        self._client = TapoClient(AuthCredential("", ""), url="", protocol=self._device)
+
+    async def test_should_send_requests_in_one_round_trip(self):
+        results = await self._client.execute_many(
+            [
+                TapoRequest.get_device_info(),
+                TapoRequest.get_energy_usage(),
+                TapoRequest.get_device_usage(),
+                TapoRequest.get_current_power(),
+            ]
+        )
+
+        self.assertEqual(
+            ["multipleRequest", "get_device_usage"],
+            [it.method for it in self._device.sent],
+        )
+        self.assertEqual({"device_on": True}, results[0].get())
+        self.assertEqual({"today_energy": 10}, results[1].get())
+        self.assertIsInstance(results[2].error(), TapoException)
+        self.assertEqual(-1008, results[2].error().error_code)
+        self.assertEqual({"current_power": 5}, results[3].get())
+
+    async def test_should_split_requests_by_batch_size(self):
+        self._client.multi_request_batch_size = 2
+
+        results = await self._client.execute_many(
+            [TapoRequest.get_device_info()] * 3 + [TapoRequest.get_current_power()]
+        )
+
+        self.assertEqual(
+            [[2], [2]], [[len(it.params.requests)] for it in self._device.sent]
+        )
+        self.assertTrue(all(result.is_success() for result in results))
+        self.assertEqual({"current_power": 5}, results[3].get())
+
+    async def test_should_retry_failed_entry_on_its_own(self):
+        device = _FailingOnceProtocol("get_energy_usage", self._device.results)
+        client = TapoClient(AuthCredential("", ""), url="", protocol=device)
+
+        results = await client.execute_many(
+            [TapoRequest.get_device_info(), TapoRequest.get_energy_usage()]
+        )
+
+        self.assertEqual(
+            ["multipleRequest", "get_energy_usage"], [it.method for it in device.sent]
+        )
+        self.assertEqual({"device_on": True}, results[0].get())
+        self.assertEqual({"today_energy": 10}, results[1].get())
+
+    async def test_should_split_batches_rejected_as_too_large(self):
+        device = _LimitedBatchProtocol(2, self._device.results)
+        client = TapoClient(AuthCredential("", ""), url="", protocol=device)
+        requests = [TapoRequest.get_device_info(), TapoRequest.get_current_power()] * 2
+
+        results = await client.execute_many(requests)
+        await client.execute_many(requests)
+
+        self.assertTrue(all(result.is_success() for result in results))
+        self.assertEqual({"current_power": 5}, results[3].get())
+        self.assertEqual([4, 2, 2, 2, 2], [len(it.params.requests) for it in device.sent])
+        self.assertEqual(2, client.multi_request_batch_size)
+
+    def test_should_take_batch_size_from_model(self):
+        TapoClient.MULTI_REQUEST_BATCH_SIZES["H100"] = 3
+        try:
+            device = DiscoveredDevice(
+                "SMART.TAPOHUB", "H100(EU)", "10.0.1.1", "", EncryptionScheme()
+            )
+            client = TapoClient.create(
+                AuthCredential("", ""), "10.0.1.1", discovered_device=device
+            )
+            self.assertEqual(3, client.multi_request_batch_size)
+        finally:
+            del TapoClient.MULTI_REQUEST_BATCH_SIZES["H100"]
@@ -0,0 +1,187 @@
+import asyncio
+import unittest
+
+from plugp100.api.hub.hub_device import HubDevice
+from plugp100.api.tapo_client import TapoClient
+from plugp100.common.credentials import AuthCredential
+from plugp100.protocol import handshake_scheduler
+from plugp100.protocol.handshake_scheduler import (
+    HandshakeScheduler,
+    HandshakePriority,
+    HandshakeTicket,
+    handshake_priority,
+)
+from plugp100.protocol.klap_protocol import KlapProtocol
+from plugp100.requests.tapo_request import TapoRequest
+from tests.unit.test_utils import TapoProtocolStub, KlapDeviceStub
+
+_CREDENTIAL = AuthCredential("user@mail.com", "password")
+
+
+class _NamedKlapDevice(KlapDeviceStub):
+    """KLAP device recording in `handshakes` its name whenever a handshake starts."""
+
+    def __init__(self, name: str, handshakes: list):
+        super().__init__(_CREDENTIAL)
+        self._name = name
+        self._handshakes = handshakes
+
+    async def post(self, url, data, *args, **kwargs):
+        if url.endswith("/handshake1"):
+            self._handshakes.append(self._name)
+        return await super().post(url, data, *args, **kwargs)
+
+
+class HandshakeSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_should_cap_handshakes_in_progress(self):
+        scheduler = HandshakeScheduler(max_concurrent=2)
+        in_progress = []
+
+        async def handshake():
+            async with scheduler.slot():
+                in_progress.append(scheduler.in_progress)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(handshake() for _ in range(6)))
+
+        self.assertEqual(2, max(in_progress))
+        self.assertEqual(0, scheduler.in_progress)
+        self.assertEqual(6, scheduler.stats.admitted)
+        self.assertEqual(4, scheduler.stats.queued)
+        self.assertGreater(scheduler.stats.max_wait_seconds, 0)
+
+    async def test_should_admit_interactive_handshakes_first(self):
+        scheduler = HandshakeScheduler(max_concurrent=1)
+        admitted = []
+        release = asyncio.Event()
+
+        async def handshake(name: str):
+            async with scheduler.slot():
+                admitted.append(name)
+                await release.wait()
+
+        async def poll(name: str):
+            with handshake_priority(HandshakePriority.BACKGROUND):
+                await handshake(name)
+
+        tasks = [asyncio.create_task(poll("poll 1"))]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(poll("poll 2"))]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(handshake("interactive"))]
+        await asyncio.sleep(0)
+        self.assertEqual(2, scheduler.queue_depth)
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(["poll 1", "interactive", "poll 2"], admitted)
+
+    async def test_should_pass_slot_on_when_waiter_gives_up(self):
+        scheduler = HandshakeScheduler(max_concurrent=1)
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot():
+                await release.wait()
+
+        task = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        with self.assertRaises(asyncio.TimeoutError):
+            async with scheduler.slot(timeout=0.01):
+                pass
+        release.set()
+        await task
+
+        async with scheduler.slot(timeout=1):
+            self.assertEqual(1, scheduler.in_progress)
+        self.assertEqual(0, scheduler.queue_depth)
+
+    async def test_should_admit_raised_ticket_with_its_new_priority(self):
+        scheduler = HandshakeScheduler(max_concurrent=1)
+        admitted = []
+        release = asyncio.Event()
+        poll_ticket = HandshakeTicket(HandshakePriority.BACKGROUND)
+
+        async def handshake(name: str, ticket=None):
+            async with scheduler.slot(ticket=ticket):
+                admitted.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(handshake("holder"))]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(handshake("interactive"))]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(handshake("poll", poll_ticket))]
+        await asyncio.sleep(0)
+        poll_ticket.raise_priority(HandshakePriority.BACKGROUND)
+        self.assertEqual(2, scheduler.queue_depth)
+        # same priority as the interactive handshake, which arrived first
+        poll_ticket.raise_priority(HandshakePriority.INTERACTIVE)
+        self.assertEqual(2, scheduler.queue_depth)
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(["holder", "interactive", "poll"], admitted)
+        self.assertEqual(0, scheduler.queue_depth)
+
+    async def test_interactive_request_should_raise_handshake_it_waits_for(self):
+        scheduler = HandshakeScheduler(max_concurrent=1)
+        handshakes = []
+
+        def protocol(name: str) -> KlapProtocol:
+            return KlapProtocol(
+                _CREDENTIAL,
+                f"http://{name}/app",
+                transport=_NamedKlapDevice(name, handshakes),
+                handshake_scheduler=scheduler,
+            )
+
+        other, controlled = protocol("other"), protocol("controlled")
+        release = asyncio.Event()
+
+        async def hold_slot():
+            async with scheduler.slot():
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold_slot())]
+        await asyncio.sleep(0)
+        with handshake_priority(HandshakePriority.BACKGROUND):
+            # the poll of the controlled device holds its handshake lock while queued
+            for polled in (other, controlled):
+                tasks += [
+                    asyncio.create_task(
+                        polled.send_request(TapoRequest.get_device_info())
+                    )
+                ]
+                await asyncio.sleep(0.01)
+        tasks += [
+            asyncio.create_task(controlled.send_request(TapoRequest.get_device_info()))
+        ]
+        await asyncio.sleep(0.01)
+        self.assertEqual(2, scheduler.queue_depth)
+
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        self.assertEqual(["controlled", "other"], handshakes)
+        self.assertTrue(all(result.is_success() for result in results[1:]))
+
+    async def test_hub_device_list_poll_should_have_background_priority(self):
+        priorities = []
+
+        class _Protocol(TapoProtocolStub):
+            async def send_request(self, request, retry=3, timeout=None):
+                priorities.append(handshake_scheduler._priority.get())
+                return await super().send_request(request, retry, timeout)
+
+        protocol = _Protocol({"get_child_device_list": {"child_device_list": []}})
+        hub = HubDevice(TapoClient(AuthCredential("", ""), url="", protocol=protocol))
+
+        await hub._poll_device_list(set())
+        await hub.get_children()
+
+        self.assertEqual(
+            [HandshakePriority.BACKGROUND, HandshakePriority.INTERACTIVE], priorities
+        )
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import unittest
+
+import aiohttp
+from aiohttp import web
+
+from plugp100.common.utils import http_client
+from plugp100.common.utils.http_client import AsyncHttp
+
+
+class DefaultSessionTest(unittest.IsolatedAsyncioTestCase):
+    async def test_should_share_default_session_and_close_on_last_release(self):
+        first, second = AsyncHttp(), AsyncHttp()
+
+        session = first.session
+        self.assertIs(session, second.session)
+
+        await first.close()
+        self.assertFalse(session.closed)
+        await second.close()
+        self.assertTrue(session.closed)
+        self.assertNotIn(asyncio.get_running_loop(), http_client._default_sessions)
+
+    async def test_should_never_close_session_of_caller(self):
+        session = aiohttp.ClientSession()
+        try:
+            http = AsyncHttp(session)
+            self.assertIs(session, http.session)
+            await http.close()
+            self.assertFalse(session.closed)
+        finally:
+            await session.close()
+
+    async def test_should_acquire_new_session_after_close(self):
+        http = AsyncHttp()
+        session = http.session
+        await http.close()
+
+        reacquired = http.session
+        try:
+            self.assertIsNot(session, reacquired)
+            self.assertFalse(reacquired.closed)
+        finally:
+            await http.close()
+        self.assertTrue(reacquired.closed)
+
+
+class DefaultSessionAcrossLoopsTest(unittest.TestCase):
+    def test_should_release_on_loop_which_acquired_session(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        try:
+
+            async def acquire():
+                return http.session
+
+            http = AsyncHttp()
+            session = asyncio.run_coroutine_threadsafe(acquire(), loop).result()
+
+            with self.assertLogs(http_client.logger, "WARNING"):
+                asyncio.run(http.close())
+
+            async def wait_closed():
+                while not session.closed:
+                    await asyncio.sleep(0.01)
+
+            asyncio.run_coroutine_threadsafe(wait_closed(), loop).result(timeout=1)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def test_should_log_close_after_loop_stopped(self):
+        loop = asyncio.new_event_loop()
+
+        async def acquire():
+            return http.session
+
+        http = AsyncHttp()
+        session = loop.run_until_complete(acquire())
+        try:
+            with self.assertLogs(http_client.logger, "WARNING"):
+                asyncio.run(http.close())
+        finally:
+            loop.run_until_complete(session.close())
+            loop.close()
+
+
+class _DroppingServer:
+    """
+    Local aiohttp server answering only the first request of each connection, then
+    dropping the connection at the next one, as devices do with idle sockets.
+    """
+
+    def __init__(self):
+        self.connections = []
+        self.connection_headers = []
+        self._runner = None
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/app", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://127.0.0.1:{port}/app"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.connection_headers.append(request.headers.get("Connection"))
+        if request.transport in self.connections:
+            request.transport.close()
+            raise ConnectionResetError()
+        self.connections.append(request.transport)
+        return web.Response(body=await request.read())
+
+
+class AsyncHttpPostTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self._server = _DroppingServer()
+        self._url = await self._server.start()
+        self.addAsyncCleanup(self._server.stop)
+
+    async def test_should_retry_once_when_kept_alive_connection_dropped(self):
+        http = AsyncHttp(keep_alive=True)
+        self.addAsyncCleanup(http.close)
+
+        _, first = await http.async_make_post_bytes(self._url, b"first")
+        _, second = await http.async_make_post_bytes(self._url, b"second")
+
+        self.assertEqual((b"first", b"second"), (first, second))
+        self.assertEqual(2, len(self._server.connections))
+        self.assertEqual(3, len(self._server.connection_headers))
+
+    async def test_should_ask_to_close_connection_without_keep_alive(self):
+        http = AsyncHttp(keep_alive=False)
+        self.addAsyncCleanup(http.close)
+
+        for body in (b"first", b"second"):
+            _, response = await http.async_make_post_bytes(self._url, body)
+            self.assertEqual(body, response)
+
+        self.assertEqual(["close", "close"], self._server.connection_headers)
+        self.assertEqual(2, len(self._server.connections))
@@ -0,0 +1,43 @@
+import unittest
+
+from plugp100.api.hub.hub_device import HubDevice
+from plugp100.api.tapo_client import TapoClient
+from plugp100.common.credentials import AuthCredential
+from plugp100.requests.tapo_request import TapoRequest
+from tests.unit.test_utils import TapoProtocolStub
+
+
+class HubControlChildrenTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self._device = TapoProtocolStub(
+            {"get_device_info": {"device_on": True}, "set_device_info": -1008}
+        )
+        api = TapoClient(AuthCredential("", ""), url="", protocol=self._device)
+        api.multi_request_batch_size = 3
+        self.hub = HubDevice(api=api)
+
+    async def test_should_control_children_in_chunks(self):
+        results = await self.hub.control_children(
+            {
+                "child-1": [TapoRequest.get_device_info()],
+                "child-2": [
+                    TapoRequest.get_device_info(),
+                    TapoRequest.set_device_info({"device_on": True}),
+                ],
+                "child-3": [TapoRequest.get_device_info()],
+            }
+        )
+
+        self.assertEqual(
+            [["child-1", "child-2"], ["child-3"]],
+            [
+                [it.params.device_id for it in request.params.requests]
+                if request.method == "multipleRequest"
+                else [request.params.device_id]
+                for request in self._device.sent
+            ],
+        )
+        self.assertEqual({"device_on": True}, results["child-1"][0].get())
+        self.assertEqual({"device_on": True}, results["child-2"][0].get())
+        self.assertEqual(-1008, results["child-2"][1].error().error_code)
+        self.assertEqual({"device_on": True}, results["child-3"][0].get())
@@ -0,0 +1,40 @@
+import asyncio
+import unittest
+
+from plugp100.encryption.key_pair import KeyPair
+from plugp100.encryption.key_pair_pool import KeyPairPool
+
+
+class KeyPairPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def test_should_hand_out_distinct_key_pairs_and_refill(self):
+        pool = KeyPairPool(size=2)
+
+        first = await pool.acquire()
+        second = await pool.acquire()
+        for _ in range(100):
+            if len(pool._ready) == 2:
+                break
+            await asyncio.sleep(0.05)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(2, len(pool._ready))
+
+    async def test_should_reuse_key_pair_within_reuse_time(self):
+        pool = KeyPairPool(size=1, reuse_for=60)
+
+        first = await pool.acquire()
+        second = await pool.acquire()
+
+        self.assertIs(first, second)
+
+    def test_should_decode_private_key_once(self):
+        generated = KeyPair.create_key_pair()
+        key_pair = KeyPair(generated.get_private_key(), generated.get_public_key())
+
+        private_key = key_pair.get_rsa_private_key()
+
+        self.assertIs(private_key, key_pair.get_rsa_private_key())
+        self.assertEqual(
+            generated.get_rsa_private_key().private_numbers(),
+            private_key.private_numbers(),
+        )
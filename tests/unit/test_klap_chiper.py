@@ -0,0 +1,30 @@
+import hashlib
+import os
+import unittest
+
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from plugp100.protocol.klap_protocol import KlapChiper
+
+
+def _reference_encrypt(chiper: KlapChiper, msg: bytes, seq: int) -> bytes:
+    seq_bytes = seq.to_bytes(4, "big", signed=True)
+    padder = padding.PKCS7(128).padder()
+    encryptor = Cipher(
+        algorithms.AES(chiper._key), modes.CBC(chiper._iv + seq_bytes)
+    ).encryptor()
+    ciphertext = encryptor.update(padder.update(msg) + padder.finalize())
+    ciphertext += encryptor.finalize()
+    return hashlib.sha256(chiper._sig + seq_bytes + ciphertext).digest() + ciphertext
+
+
+class KlapChiperTest(unittest.TestCase):
+    def setUp(self):
+        self.chiper = KlapChiper(os.urandom(16), os.urandom(16), os.urandom(32))
+
+    def test_should_sign_and_encrypt_with_sequence_iv(self):
+        for msg in (b"", b"a" * 15, b"b" * 16, os.urandom(700)):
+            payload, seq = self.chiper.encrypt(msg)
+            self.assertEqual(_reference_encrypt(self.chiper, msg, seq), payload)
+            self.assertEqual(msg, self.chiper.decrypt_bytes(payload, seq))
@@ -0,0 +1,33 @@
+import unittest
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.protocol import klap_protocol
+from plugp100.protocol.klap_protocol import KlapProtocol, _auth_hash
+from plugp100.requests.tapo_request import TapoRequest
+from tests.unit.test_utils import KlapDeviceStub
+
+_CREDENTIAL = AuthCredential("user@mail.com", "password")
+
+
+class KlapHandshakeTest(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self):
+        klap_protocol._matched_auth_variants.clear()
+
+    async def test_should_remember_matching_credential_variant_per_host(self):
+        device = KlapDeviceStub(AuthCredential("", ""))
+        first = KlapProtocol(_CREDENTIAL, "http://10.0.0.1/app", transport=device)
+        self.assertEqual("configured", first._auth_variants_by_likelihood()[0][0])
+
+        response = await first.send_request(TapoRequest.get_device_info())
+
+        self.assertTrue(response.is_success())
+        restarted = KlapProtocol(_CREDENTIAL, "http://10.0.0.1/app", transport=device)
+        other_host = KlapProtocol(_CREDENTIAL, "http://10.0.0.2/app", transport=device)
+        self.assertEqual("blank", restarted._auth_variants_by_likelihood()[0][0])
+        self.assertEqual("configured", other_host._auth_variants_by_likelihood()[0][0])
+
+    def test_should_derive_auth_hash_once_per_credential(self):
+        hits = _auth_hash.cache_info().hits
+        for _ in range(3):
+            KlapProtocol(AuthCredential("fleet", "secret"), "http://10.0.0.3/app")
+        self.assertEqual(hits + 2, _auth_hash.cache_info().hits)
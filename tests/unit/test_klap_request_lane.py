@@ -0,0 +1,60 @@
+import asyncio
+import random
+import unittest
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.protocol.klap_protocol import KlapProtocol
+from plugp100.requests.tapo_request import TapoRequest
+from tests.unit.test_utils import KlapDeviceStub
+
+_CREDENTIAL = AuthCredential("user@mail.com", "password")
+_URL = "http://127.0.0.1/app"
+
+
+class _JitteryDevice(KlapDeviceStub):
+    """Device on a network delaying every request by a random amount."""
+
+    def __init__(self, credential: AuthCredential):
+        super().__init__(credential)
+        self.received_seqs = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def post(self, url, data, headers=None, cookies=None, params=None, **kwargs):
+        if params is None:
+            return await super().post(url, data, headers, cookies, params, **kwargs)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(random.uniform(0, 0.005))
+            self.received_seqs.append(params["seq"])
+            return await super().post(url, data, headers, cookies, params, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+class KlapRequestLaneTest(unittest.IsolatedAsyncioTestCase):
+    async def test_should_send_requests_one_at_a_time_in_seq_order(self):
+        device = _JitteryDevice(_CREDENTIAL)
+        protocol = KlapProtocol(_CREDENTIAL, _URL, transport=device)
+
+        responses = await asyncio.gather(
+            *[protocol.send_request(TapoRequest.get_device_info()) for _ in range(20)]
+        )
+
+        self.assertTrue(all(response.is_success() for response in responses))
+        self.assertEqual(1, device.max_in_flight)
+        self.assertEqual(sorted(device.received_seqs), device.received_seqs)
+        self.assertEqual(20, len(set(device.received_seqs)))
+
+    async def test_should_bound_requests_in_flight(self):
+        device = _JitteryDevice(_CREDENTIAL)
+        protocol = KlapProtocol(_CREDENTIAL, _URL, transport=device, max_in_flight=3)
+
+        responses = await asyncio.gather(
+            *[protocol.send_request(TapoRequest.get_device_info()) for _ in range(20)]
+        )
+
+        self.assertTrue(all(response.is_success() for response in responses))
+        self.assertEqual(3, device.max_in_flight)
+        self.assertEqual(20, len(set(device.received_seqs)))
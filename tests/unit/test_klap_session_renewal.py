@@ -0,0 +1,77 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.protocol.klap_protocol import KlapProtocol, KlapSession
+from plugp100.requests.tapo_request import TapoRequest
+from tests.unit.test_utils import KlapDeviceStub
+
+_CREDENTIAL = AuthCredential("user@mail.com", "password")
+
+
+class KlapSessionRenewalTest(unittest.IsolatedAsyncioTestCase):
+    async def test_should_renew_session_in_background(self):
+        device = KlapDeviceStub(_CREDENTIAL)
+        protocol = KlapProtocol(
+            _CREDENTIAL, "http://127.0.0.1/app", transport=device, session_renewal=True
+        )
+        try:
+            with patch.object(KlapSession, "renewal_delay", return_value=0.01):
+                first = await protocol.send_request(TapoRequest.get_device_info())
+                first_session_id = protocol._klap_session.session_id
+                await asyncio.sleep(0.1)
+                second = await protocol.send_request(TapoRequest.get_device_info())
+                second_session_id = protocol._klap_session.session_id
+        finally:
+            await protocol.close()
+
+        self.assertTrue(first.is_success() and second.is_success())
+        self.assertNotEqual(first_session_id, second_session_id)
+        self.assertGreaterEqual(protocol.handshake_stats.renewals, 1)
+        self.assertEqual(1, protocol.handshake_stats.blocking_handshakes)
+
+    async def test_should_handshake_before_sending_on_expired_session(self):
+        device = KlapDeviceStub(_CREDENTIAL, session_timeout=30)
+        protocol = KlapProtocol(_CREDENTIAL, "http://127.0.0.1/app", transport=device)
+
+        for _ in range(2):
+            response = await protocol.send_request(TapoRequest.get_device_info(), 0)
+            self.assertEqual("get_device_info", response.get().result["method"])
+
+        self.assertEqual(2, protocol.handshake_stats.blocking_handshakes)
+        self.assertEqual(2, device.requests)
+
+    async def test_should_retry_renewal_after_network_error(self):
+        device = KlapDeviceStub(_CREDENTIAL)
+        protocol = KlapProtocol(
+            _CREDENTIAL, "http://127.0.0.1/app", transport=device, session_renewal=True
+        )
+        post = device.post
+        unreachable = True
+
+        async def flaky_post(url, data, *args, **kwargs):
+            if unreachable and url.endswith("handshake1"):
+                raise ConnectionResetError("device unreachable")
+            return await post(url, data, *args, **kwargs)
+
+        try:
+            with patch.object(
+                KlapSession, "renewal_delay", return_value=0.01
+            ), patch.object(KlapProtocol, "RENEWAL_RETRY_DELAY", 0.01):
+                await protocol.send_request(TapoRequest.get_device_info())
+                first_session_id = protocol._klap_session.session_id
+                device.post = flaky_post
+                await asyncio.sleep(0.05)
+                self.assertGreaterEqual(protocol.handshake_stats.failed_renewals, 1)
+                self.assertIsNotNone(protocol._renewal_task)
+                self.assertFalse(protocol._renewal_task.done())
+
+                unreachable = False
+                await asyncio.sleep(0.05)
+                renewed_session_id = protocol._klap_session.session_id
+        finally:
+            await protocol.close()
+
+        self.assertGreaterEqual(protocol.handshake_stats.renewals, 1)
+        self.assertNotEqual(first_session_id, renewed_session_id)
@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.functional.tri import Success
+from plugp100.protocol import passthrough_protocol
+from plugp100.protocol.passthrough_protocol import PassthroughProtocol
+from plugp100.protocol.session_store import InMemorySessionStore, load_capabilities
+from plugp100.requests.login_device import LoginDeviceParamsV2
+from plugp100.requests.tapo_request import TapoRequest
+from plugp100.responses.tapo_response import TapoResponse
+
+_CREDENTIAL = AuthCredential("user@mail.com", "password")
+_URL = "http://10.0.1.1/app"
+
+
+def _v2_only_protocol(store: InMemorySessionStore) -> PassthroughProtocol:
+    protocol = PassthroughProtocol(_CREDENTIAL, _URL, session_store=store)
+
+    async def send(request: TapoRequest, session, timeout=None):
+        if request.method != "login_device":
+            return TapoResponse.try_from_json({"error_code": 0, "result": {}})
+        if isinstance(request.params, LoginDeviceParamsV2):
+            return TapoResponse.try_from_json(
+                {"error_code": 0, "result": {"token": "token"}}
+            )
+        return TapoResponse.try_from_json({"error_code": -1501})
+
+    protocol._passthrough.handshake = AsyncMock(
+        side_effect=lambda *args: Success(
+            MagicMock(token=None, is_handshake_session_expired=lambda: False)
+        )
+    )
+    protocol._passthrough.send = AsyncMock(side_effect=send)
+    return protocol
+
+
+class PassthroughLoginTest(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self):
+        passthrough_protocol._login_v2_devices.pop(_URL, None)
+
+    async def test_should_try_remembered_login_version_first(self):
+        store = InMemorySessionStore()
+        protocol = _v2_only_protocol(store)
+
+        response = await protocol.send_request(TapoRequest.get_device_info())
+        self.assertTrue(response.is_success())
+        self.assertEqual(2, protocol._passthrough.handshake.await_count)
+        self.assertEqual(2, load_capabilities(store, _URL)["login_version"])
+
+        protocol._session.token = None  # session timed out
+        await protocol.send_request(TapoRequest.get_device_info())
+        self.assertEqual(3, protocol._passthrough.handshake.await_count)
+
+        passthrough_protocol._login_v2_devices.clear()
+        restarted = _v2_only_protocol(store)
+        response = await restarted.send_request(TapoRequest.get_device_info())
+        self.assertTrue(response.is_success())
+        self.assertEqual(1, restarted._passthrough.handshake.await_count)
+
+    async def test_should_not_remember_login_version_before_login(self):
+        guessing_v2 = PassthroughProtocol(_CREDENTIAL, _URL, login_version=2)
+        self.assertTrue(await guessing_v2._prefers_login_v2())
+        self.assertNotIn(_URL, passthrough_protocol._login_v2_devices)
+
+        guessing_v1 = PassthroughProtocol(_CREDENTIAL, _URL, login_version=1)
+        self.assertFalse(await guessing_v1._prefers_login_v2())
@@ -0,0 +1,99 @@
+import unittest
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock
+
+from plugp100.api import tapo_client
+from plugp100.api.tapo_client import TapoClient, TapoProtocolType
+from plugp100.common.credentials import AuthCredential
+from plugp100.discovery.discovered_device import DiscoveredDevice, EncryptionScheme
+from plugp100.protocol import passthrough_protocol
+from plugp100.protocol.klap_protocol import KlapProtocol
+from plugp100.protocol.passthrough_protocol import PassthroughProtocol
+from plugp100.protocol.session_store import InMemorySessionStore, load_capabilities
+from plugp100.responses.tapo_response import TapoResponse
+
+_CREDENTIAL = AuthCredential("user@mail.com", "password")
+_MAC = "AA-BB-CC-DD-EE-FF"
+
+
+def _client(
+    device_protocol: Optional[TapoProtocolType], store: InMemorySessionStore
+) -> TapoClient:
+    """A client talking to a device which only answers `device_protocol`."""
+    client = TapoClient.create(_CREDENTIAL, "10.0.1.1", session_store=store)
+    client._device_key = _MAC
+    client.created = []
+
+    def create_protocol(protocol_type, login_version=None):
+        if protocol_type == device_protocol:
+            response = {"error_code": 0, "result": {"component_list": []}}
+        elif protocol_type == TapoProtocolType.PASSTHROUGH:
+            response = {"error_code": 1003}
+        else:
+            response = {"error_code": -1}
+        protocol = MagicMock(close=AsyncMock())
+        protocol.send_request = AsyncMock(
+            return_value=TapoResponse.try_from_json(response)
+        )
+        client.created.append(protocol_type)
+        return protocol
+
+    client._create_protocol = create_protocol
+    return client
+
+
+class ProtocolDetectionTest(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self):
+        tapo_client._device_protocols.clear()
+        passthrough_protocol._login_v2_devices.clear()
+
+    async def test_should_take_protocol_from_discovery(self):
+        klap = TapoClient.create(
+            _CREDENTIAL,
+            "10.0.1.1",
+            encryption_scheme=EncryptionScheme(False, "KLAP", 80, 2),
+        )
+        self.assertIsInstance(klap._protocol, KlapProtocol)
+
+        store = InMemorySessionStore()
+        discovered = DiscoveredDevice(
+            "SMART.TAPOPLUG",
+            "P100",
+            "10.0.1.2",
+            _MAC,
+            EncryptionScheme(False, "AES", 80, 2),
+        )
+        aes = TapoClient.create(
+            _CREDENTIAL, "10.0.1.2", session_store=store, discovered_device=discovered
+        )
+        self.assertIsInstance(aes._protocol, PassthroughProtocol)
+        self.assertEqual(2, aes._protocol._login_version)
+        await aes._initialize_protocol_if_needed()
+        self.assertEqual(
+            "PASSTHROUGH", load_capabilities(store, _MAC.lower())["protocol"]
+        )
+
+    async def test_should_probe_remembered_protocol_first(self):
+        store = InMemorySessionStore()
+        client = _client(TapoProtocolType.KLAP, store)
+        self.assertTrue((await client.get_device_info()).is_success())
+        self.assertEqual(
+            [TapoProtocolType.PASSTHROUGH, TapoProtocolType.KLAP], client.created
+        )
+        self.assertEqual("KLAP", load_capabilities(store, _MAC)["protocol"])
+
+        tapo_client._device_protocols.clear()
+        restarted = _client(TapoProtocolType.KLAP, store)
+        self.assertTrue((await restarted.get_device_info()).is_success())
+        self.assertEqual([TapoProtocolType.KLAP], restarted.created)
+
+    async def test_should_follow_firmware_switching_protocol(self):
+        store = InMemorySessionStore()
+        await _client(TapoProtocolType.KLAP, store).get_device_info()
+
+        updated = _client(TapoProtocolType.PASSTHROUGH, store)
+        self.assertTrue((await updated.get_device_info()).is_success())
+        self.assertEqual(
+            [TapoProtocolType.KLAP, TapoProtocolType.PASSTHROUGH], updated.created
+        )
+        self.assertEqual("PASSTHROUGH", load_capabilities(store, _MAC)["protocol"])
@@ -0,0 +1,72 @@
+import json
+import unittest
+from unittest.mock import patch
+
+import jsons
+
+from plugp100.api.light_effect import LightEffect
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.utils import json_utils
+from plugp100.requests.handshake_params import HandshakeParams
+from plugp100.requests.request_codec import encode_request, dumps_request
+from plugp100.requests.secure_passthrough_params import SecurePassthroughParams
+from plugp100.requests.set_device_info.play_alarm_params import PlayAlarmParams
+from plugp100.requests.set_device_info.set_light_color_info_params import (
+    LightColorDeviceInfoParams,
+)
+from plugp100.requests.set_device_info.set_trv_info_params import TRVDeviceInfoParams
+from plugp100.requests.tapo_request import TapoRequest, MultipleRequestParams
+from plugp100.requests.trigger_logs_params import GetTriggerLogsParams
+
+
+def _requests() -> list[TapoRequest]:
+    credential = AuthCredential("user@mail.com", "password")
+    return [
+        TapoRequest.get_device_info(),
+        TapoRequest.get_device_info()
+        .with_request_id(1234567890123)
+        .with_request_time_millis(1700000000000)
+        .with_terminal_uuid("uuid=="),
+        TapoRequest.login(credential),
+        TapoRequest.login(credential, v2=True),
+        TapoRequest.handshake(HandshakeParams("key")),
+        TapoRequest.secure_passthrough(SecurePassthroughParams("payload")),
+        TapoRequest.get_child_device_list(10),
+        TapoRequest.get_child_event_logs(GetTriggerLogsParams(5, 0)),
+        TapoRequest.set_device_info({"device_on": True, "nickname": "bmFtZQ=="}),
+        TapoRequest.set_device_info(PlayAlarmParams(alarm_duration=10)),
+        TapoRequest.set_device_info(LightColorDeviceInfoParams(hue=10, saturation=5)),
+        TapoRequest.set_device_info(TRVDeviceInfoParams(target_temp=21.5)),
+        TapoRequest.set_lighting_effect(LightEffect.aurora()),
+        TapoRequest.control_child(
+            "child", TapoRequest.set_device_info({"device_on": False})
+        ),
+        TapoRequest.multiple_request(
+            MultipleRequestParams(
+                [TapoRequest.get_device_info(), TapoRequest.get_device_usage()]
+            )
+        ),
+    ]
+
+
+class RequestCodecTest(unittest.TestCase):
+    def test_should_encode_like_jsons(self):
+        for request in _requests():
+            with self.subTest(method=request.method):
+                self.assertEqual(jsons.dump(request), encode_request(request))
+                self.assertEqual(
+                    jsons.loads(jsons.dumps(request)), json.loads(dumps_request(request))
+                )
+
+    def test_should_dump_same_bytes_as_jsons_with_stdlib_backend(self):
+        with patch.object(json_utils, "orjson", None):
+            for request in _requests():
+                with self.subTest(method=request.method):
+                    self.assertEqual(
+                        jsons.dumps(request).encode(), dumps_request(request)
+                    )
+
+    def test_should_fallback_to_jsons_for_unknown_attributes(self):
+        request = TapoRequest.get_device_info()
+        request.extra = "value"
+        self.assertEqual(jsons.dump(request), encode_request(request))
@@ -0,0 +1,76 @@
+import json
+import unittest
+from typing import Optional
+
+import jsons
+
+from plugp100.common.transport.http_transport import HttpTransport, HttpResponse
+from plugp100.encryption.tp_link_cipher import TpLinkCipher
+from plugp100.protocol.securepassthrough_transport import (
+    SecurePassthroughTransport,
+    Session,
+)
+from plugp100.requests.secure_passthrough_params import SecurePassthroughParams
+from plugp100.requests.tapo_request import TapoRequest
+from plugp100.responses.tapo_exception import TapoException
+
+
+class _PlainCipher(TpLinkCipher):
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        return data
+
+    def decrypt_bytes(self, data: bytes) -> bytes:
+        return data
+
+
+class _ReplyTransport(HttpTransport):
+    def __init__(self, reply: dict):
+        self.reply = reply
+        self.sent: list[bytes] = []
+
+    async def post(
+        self, url, data, headers=None, cookies=None, params=None, timeout=None
+    ):
+        self.sent.append(data)
+        return HttpResponse(status=200, body=json.dumps(self.reply).encode(), cookies={})
+
+    async def close(self):
+        pass
+
+
+def _session(cipher: Optional[TpLinkCipher] = None) -> Session:
+    return Session(
+        url="http://127.0.0.1/app",
+        key_pair=None,
+        chiper=cipher or _PlainCipher(),
+        session_id="id",
+        expire_at=0,
+        token="token",
+        terminal_uuid="uuid",
+    )
+
+
+class SecurePassthroughTransportTest(unittest.IsolatedAsyncioTestCase):
+    async def test_should_send_envelope_like_jsons(self):
+        inner = {"error_code": 0, "result": {"device_on": True}}
+        encrypted = _PlainCipher().encrypt(json.dumps(inner))
+        transport = _ReplyTransport({"error_code": 0, "result": {"response": encrypted}})
+        passthrough = SecurePassthroughTransport(transport)
+
+        response = await passthrough.send(TapoRequest.get_device_info(), _session())
+
+        self.assertEqual({"device_on": True}, response.get().result)
+        envelope = transport.sent[0]
+        payload = json.loads(envelope)["params"]["request"]
+        expected = TapoRequest.secure_passthrough(SecurePassthroughParams(payload))
+        self.assertEqual(jsons.dumps(expected).encode(), envelope)
+
+    async def test_should_fail_on_outer_error_code(self):
+        transport = _ReplyTransport({"error_code": 9999})
+        passthrough = SecurePassthroughTransport(transport)
+
+        response = await passthrough.send(TapoRequest.get_device_info(), _session())
+
+        self.assertTrue(response.is_failure())
+        self.assertIsInstance(response.error(), TapoException)
+        self.assertEqual(9999, response.error().error_code)
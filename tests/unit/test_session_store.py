@@ -0,0 +1,96 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.protocol.klap_protocol import KlapProtocol
+from plugp100.protocol.session_store import FileSessionStore, InMemorySessionStore
+from plugp100.requests.tapo_request import TapoRequest
+from tests.unit.test_utils import KlapDeviceStub
+
+_CREDENTIAL = AuthCredential("user@mail.com", "password")
+_URL = "http://127.0.0.1/app"
+
+
+class FileSessionStoreTest(unittest.TestCase):
+    def test_should_save_load_and_delete(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = FileSessionStore(os.path.join(directory, "sessions"))
+            self.assertIsNone(store.load("klap:a"))
+
+            store.save("klap:a", {"session_id": "1"})
+            store.save("klap:b", {"session_id": "2"})
+
+            self.assertEqual({"session_id": "1"}, store.load("klap:a"))
+            store.delete("klap:a")
+            self.assertIsNone(store.load("klap:a"))
+            self.assertEqual({"session_id": "2"}, store.load("klap:b"))
+
+
+class _ThreadRecordingFileStore(FileSessionStore):
+    """File store recording the thread of each load and save."""
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self.threads = []
+
+    def load(self, key):
+        self.threads.append(threading.current_thread())
+        return super().load(key)
+
+    def save(self, key, session):
+        self.threads.append(threading.current_thread())
+        super().save(key, session)
+
+
+class KlapSessionRestoreTest(unittest.IsolatedAsyncioTestCase):
+    async def test_should_not_access_files_on_event_loop(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = _ThreadRecordingFileStore(directory)
+            for _ in range(2):
+                protocol = KlapProtocol(
+                    _CREDENTIAL,
+                    _URL,
+                    transport=KlapDeviceStub(_CREDENTIAL),
+                    session_store=store,
+                )
+                response = await protocol.send_request(TapoRequest.get_device_info())
+                self.assertTrue(response.is_success())
+                await protocol.close()
+
+        # restored, saved after the handshake, saved on close, restored again...
+        self.assertGreaterEqual(len(store.threads), 4)
+        self.assertNotIn(threading.current_thread(), store.threads)
+
+    async def test_should_reuse_stored_session_after_restart(self):
+        device = KlapDeviceStub(_CREDENTIAL)
+        store = InMemorySessionStore()
+        for _ in range(2):
+            protocol = KlapProtocol(
+                _CREDENTIAL, _URL, transport=device, session_store=store
+            )
+            for _ in range(2):
+                response = await protocol.send_request(TapoRequest.get_device_info())
+                self.assertTrue(response.is_success())
+            await protocol.close()
+
+        self.assertEqual(1, device.handshakes)
+        self.assertEqual(4, device.requests)
+
+    async def test_should_handshake_when_stored_session_is_rejected(self):
+        store = InMemorySessionStore()
+        protocol = KlapProtocol(
+            _CREDENTIAL, _URL, transport=KlapDeviceStub(_CREDENTIAL), session_store=store
+        )
+        await protocol.send_request(TapoRequest.get_device_info())
+        await protocol.close()
+
+        rebooted_device = KlapDeviceStub(_CREDENTIAL)
+        protocol = KlapProtocol(
+            _CREDENTIAL, _URL, transport=rebooted_device, session_store=store
+        )
+        response = await protocol.send_request(TapoRequest.get_device_info())
+
+        self.assertTrue(response.is_success())
+        self.assertEqual(1, rebooted_device.handshakes)
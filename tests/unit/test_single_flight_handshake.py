@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.functional.tri import Try
+from plugp100.protocol.klap_protocol import KlapProtocol
+from plugp100.protocol.passthrough_protocol import PassthroughProtocol
+from plugp100.requests.tapo_request import TapoRequest
+from plugp100.responses.tapo_response import TapoResponse
+from tests.unit.test_utils import KlapDeviceStub
+
+_CREDENTIAL = AuthCredential("user@mail.com", "password")
+_URL = "http://127.0.0.1/app"
+
+
+class SingleFlightHandshakeTest(unittest.IsolatedAsyncioTestCase):
+    async def test_klap_concurrent_requests_should_share_handshake(self):
+        device = KlapDeviceStub(_CREDENTIAL)
+        protocol = KlapProtocol(_CREDENTIAL, _URL, transport=device)
+
+        responses = await asyncio.gather(
+            *[protocol.send_request(TapoRequest.get_device_info()) for _ in range(10)]
+        )
+        self.assertTrue(all(response.is_success() for response in responses))
+        self.assertEqual(1, device.handshakes)
+
+        device.sessions.clear()
+        responses = await asyncio.gather(
+            *[protocol.send_request(TapoRequest.get_device_info()) for _ in range(10)]
+        )
+        self.assertTrue(all(response.is_success() for response in responses))
+        self.assertEqual(2, device.handshakes)
+
+    async def test_passthrough_concurrent_requests_should_share_login(self):
+        protocol = PassthroughProtocol(_CREDENTIAL, _URL)
+
+        async def login(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return Try.of(MagicMock(token="token", terminal_uuid="uuid"))
+
+        protocol._login_with_version = AsyncMock(side_effect=login)
+        protocol._passthrough.send = AsyncMock(
+            return_value=TapoResponse.try_from_json({"error_code": 0, "result": {}})
+        )
+
+        responses = await asyncio.gather(
+            *[protocol.send_request(TapoRequest.get_device_info()) for _ in range(10)]
+        )
+
+        self.assertTrue(all(response.is_success() for response in responses))
+        self.assertEqual(1, protocol._login_with_version.await_count)
+        self.assertEqual(10, protocol._passthrough.send.await_count)
@@ -0,0 +1,152 @@
+import asyncio
+import unittest
+from typing import List, Tuple
+
+from plugp100.common.transport.stream_transport import StreamTransport
+
+
+class _CannedHttpServer:
+    """
+    Local server answering each request with the next of `replies`, raw bytes sent as
+    they are, closing the connection afterwards when asked to.
+    """
+
+    def __init__(self, replies: List[Tuple[bytes, bool]]):
+        self._replies = iter(replies)
+        self.connections = 0
+        self.requests: List[bytes] = []
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}/app"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                content_length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    if line.lower().startswith(b"content-length:"):
+                        content_length = int(line.split(b":")[1])
+                if not line:
+                    break
+                self.requests.append(await reader.readexactly(content_length))
+                reply, close = next(self._replies)
+                writer.write(reply)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _reply(body: bytes, *headers: str) -> bytes:
+    head = "".join(f"{header}\r\n" for header in headers)
+    return f"HTTP/1.1 200 OK\r\n{head}\r\n".encode("latin-1") + body
+
+
+class StreamTransportTest(unittest.IsolatedAsyncioTestCase):
+    async def _serve(self, *replies: Tuple[bytes, bool]) -> str:
+        self._server = _CannedHttpServer(list(replies))
+        self._transport = StreamTransport()
+        url = await self._server.start()
+        self.addAsyncCleanup(self._server.stop)
+        self.addAsyncCleanup(self._transport.close)
+        return url
+
+    async def test_should_frame_replies_by_content_length(self):
+        url = await self._serve(
+            (_reply(b"first", "Content-Length: 5"), False),
+            (_reply(b"second", "Content-Length: 6"), False),
+        )
+
+        first = await self._transport.post(url, b"one")
+        second = await self._transport.post(url, b"two", params={"seq": 1})
+
+        self.assertEqual((200, b"first"), (first.status, first.body))
+        self.assertEqual(b"second", second.body)
+        self.assertEqual([b"one", b"two"], self._server.requests)
+        self.assertEqual(1, self._server.connections)
+
+    async def test_should_read_reply_without_length_until_closed(self):
+        url = await self._serve(
+            (_reply(b"until closed"), True),
+            (_reply(b"closing", "Content-Length: 7", "Connection: close"), True),
+            (_reply(b"again", "Content-Length: 5"), False),
+        )
+
+        until_closed = await self._transport.post(url, b"")
+        closing = await self._transport.post(url, b"")
+        again = await self._transport.post(url, b"")
+
+        self.assertEqual(b"until closed", until_closed.body)
+        self.assertEqual(b"closing", closing.body)
+        self.assertEqual(b"again", again.body)
+        self.assertEqual(3, self._server.connections)
+
+    async def test_should_parse_every_cookie(self):
+        url = await self._serve(
+            (
+                _reply(
+                    b"",
+                    "Set-Cookie: TP_SESSIONID=abc;Path=/",
+                    "Set-Cookie: TIMEOUT=86400",
+                    "Content-Length: 0",
+                ),
+                False,
+            ),
+        )
+
+        response = await self._transport.post(url, b"")
+
+        self.assertEqual({"TP_SESSIONID": "abc", "TIMEOUT": "86400"}, response.cookies)
+
+    async def test_should_reconnect_once_when_idle_connection_was_dropped(self):
+        url = await self._serve(
+            # closed by the device without notice after replying
+            (_reply(b"first", "Content-Length: 5"), True),
+            (_reply(b"second", "Content-Length: 6"), False),
+        )
+
+        await self._transport.post(url, b"")
+        await asyncio.sleep(0.01)
+        second = await self._transport.post(url, b"")
+
+        self.assertEqual(b"second", second.body)
+        self.assertEqual(2, self._server.connections)
+
+    async def test_should_reject_chunked_reply_and_reconnect(self):
+        url = await self._serve(
+            (_reply(b"5\r\nfirst\r\n0\r\n\r\n", "Transfer-Encoding: chunked"), False),
+            (_reply(b"second", "Content-Length: 6"), False),
+        )
+
+        with self.assertRaises(ValueError):
+            await self._transport.post(url, b"")
+        second = await self._transport.post(url, b"")
+
+        self.assertEqual(b"second", second.body)
+        self.assertEqual(2, self._server.connections)
+
+    async def test_should_not_reuse_connection_after_malformed_reply(self):
+        url = await self._serve(
+            (_reply(b"leftover body", "Content-Length: oops"), False),
+            (b"garbage\r\n\r\n", False),
+            (_reply(b"second", "Content-Length: 6"), False),
+        )
+
+        with self.assertRaises(ValueError):
+            await self._transport.post(url, b"")
+        with self.assertRaisesRegex(ValueError, "status line"):
+            await self._transport.post(url, b"")
+        second = await self._transport.post(url, b"")
+
+        self.assertEqual(b"second", second.body)
+        self.assertEqual(3, self._server.connections)
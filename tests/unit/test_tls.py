@@ -0,0 +1,129 @@
+import asyncio
+import datetime
+import os
+import ssl
+import tempfile
+import unittest
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from plugp100.api.tapo_client import TapoClient, TapoProtocolType
+from plugp100.common.credentials import AuthCredential
+from plugp100.common.transport.aiohttp_transport import AiohttpTransport
+from plugp100.common.transport.http_transport import HttpTransport
+from plugp100.common.transport.stream_transport import StreamTransport
+from plugp100.common.transport.tls import DeviceSSLContext
+from plugp100.discovery.discovered_device import EncryptionScheme
+
+
+def _self_signed_server_context() -> ssl.SSLContext:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "tapo-device")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        cert_file = os.path.join(directory, "cert.pem")
+        key_file = os.path.join(directory, "key.pem")
+        with open(cert_file, "wb") as f:
+            f.write(certificate.public_bytes(serialization.Encoding.PEM))
+        with open(key_file, "wb") as f:
+            f.write(
+                key.private_bytes(
+                    serialization.Encoding.PEM,
+                    serialization.PrivateFormat.PKCS8,
+                    serialization.NoEncryption(),
+                )
+            )
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+async def _echo(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            content_length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                if line.lower().startswith(b"content-length:"):
+                    content_length = int(line.split(b":")[1])
+            if not line:
+                break
+            body = await reader.readexactly(content_length)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body))
+            writer.write(body)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+        pass
+    finally:
+        writer.close()
+
+
+class TlsSessionResumptionTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        server = await asyncio.start_server(
+            _echo, "127.0.0.1", 0, ssl=_self_signed_server_context()
+        )
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        self._url = f"https://127.0.0.1:{server.sockets[0].getsockname()[1]}/app"
+
+    async def _reconnect(self, transport: HttpTransport, connections: int):
+        for i in range(connections):
+            response = await transport.post(self._url, b"%d" % i)
+            self.assertEqual(b"%d" % i, response.body)
+            await transport.close()
+
+    async def test_stream_transport_should_resume_tls_session(self):
+        context = DeviceSSLContext()
+
+        await self._reconnect(StreamTransport(context), 3)
+
+        self.assertEqual(3, context.handshakes)
+        self.assertGreater(context.resumed_handshakes, 0)
+
+    async def test_aiohttp_transport_should_resume_tls_session(self):
+        context = DeviceSSLContext()
+
+        await self._reconnect(AiohttpTransport(ssl_context=context), 3)
+
+        self.assertEqual(3, context.handshakes)
+        self.assertGreater(context.resumed_handshakes, 0)
+
+
+class HttpsClientTest(unittest.TestCase):
+    def test_should_take_scheme_and_port_from_encryption_scheme(self):
+        client = TapoClient.create(
+            AuthCredential("", ""),
+            "10.0.1.1",
+            protocol_type=TapoProtocolType.KLAP,
+            encryption_scheme=EncryptionScheme(
+                is_support_https=True, encrypt_type="KLAP", http_port=4433
+            ),
+        )
+
+        self.assertEqual("https://10.0.1.1:4433/app", client._url)
+        self.assertTrue(client._keep_alive)
+        self.assertTrue(client._protocol._transport._http.keep_alive)
+
+    def test_should_not_keep_plain_http_alive_by_default(self):
+        client = TapoClient.create(
+            AuthCredential("", ""),
+            "10.0.1.1",
+            protocol_type=TapoProtocolType.KLAP,
+            encryption_scheme=EncryptionScheme(is_support_https=False, http_port=8080),
+        )
+
+        self.assertEqual("http://10.0.1.1:8080/app", client._url)
+        self.assertFalse(client._keep_alive)
@@ -0,0 +1,38 @@
+import os
+import unittest
+
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from plugp100.encryption.tp_link_cipher import TpLinkCipherCryptography
+
+
+def _reference_encrypt(key: bytes, iv: bytes, data: bytes) -> bytes:
+    padder = padding.PKCS7(128).padder()
+    encryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).encryptor()
+    padded = padder.update(data) + padder.finalize()
+    return encryptor.update(padded) + encryptor.finalize()
+
+
+class TpLinkCipherTest(unittest.TestCase):
+    def setUp(self):
+        self.key, self.iv = os.urandom(16), os.urandom(16)
+        self.cipher = TpLinkCipherCryptography(self.key, self.iv)
+
+    def test_should_encrypt_every_message_from_iv(self):
+        for size in (0, 1, 15, 16, 17, 1200, 3, 32):
+            data = os.urandom(size)
+            with self.subTest(size=size):
+                encrypted = self.cipher.encrypt_bytes(data)
+                self.assertEqual(_reference_encrypt(self.key, self.iv, data), encrypted)
+                self.assertEqual(data, self.cipher.decrypt_bytes(encrypted))
+
+    def test_should_keep_string_api(self):
+        message = '{"method": "get_device_info", "nickname": "caffè"}'
+        self.assertEqual(message, self.cipher.decrypt(self.cipher.encrypt(message)))
+
+    def test_should_reject_truncated_message(self):
+        encrypted = self.cipher.encrypt_bytes(b"payload")
+        with self.assertRaises(ValueError):
+            self.cipher.decrypt_bytes(encrypted[:-1])
+        self.assertEqual(b"payload", self.cipher.decrypt_bytes(encrypted))
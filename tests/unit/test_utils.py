@@ -1,7 +1,17 @@
+import asyncio
+import hashlib
+import json
+import os
 import random
+import uuid
 from typing import Any, List
 
+from plugp100.common.credentials import AuthCredential
 from plugp100.common.functional.tri import Try
+from plugp100.common.transport.http_transport import HttpTransport, HttpResponse
+from plugp100.protocol.klap_protocol import KlapProtocol, KlapChiper
+from plugp100.protocol.tapo_protocol import TapoProtocol
+from plugp100.requests.tapo_request import TapoRequest
 from plugp100.responses.child_device_list import ChildDeviceList
 from plugp100.responses.tapo_response import TapoResponse
 
@@ -24,3 +34,98 @@ def generate_random_children(partition_size: int, total: int) -> List[ChildDevic
     last_children = [{"id": rnd.random()} for j in range(0, remaining)]
     lists.append(ChildDeviceList(last_children, total - remaining, total))
     return lists
+
+
+class KlapDeviceStub(HttpTransport):
+    """In-memory KLAP device answering every request with its method name."""
+
+    def __init__(self, credential: AuthCredential, session_timeout: int = 86400):
+        self._auth_hash = KlapProtocol.generate_auth_hash(credential)
+        self._session_timeout = session_timeout
+        self._pending: dict[str, tuple[bytes, bytes]] = {}
+        self.sessions: dict[str, KlapChiper] = {}
+        self.handshakes = 0
+        self.requests = 0
+
+    async def post(
+        self, url, data, headers=None, cookies=None, params=None, timeout=None
+    ) -> HttpResponse:
+        await asyncio.sleep(0)  # let concurrent requests interleave as on a network
+        path = url.rsplit("/", 1)[-1]
+        if path == "handshake1":
+            self.handshakes += 1
+            session_id, remote_seed = uuid.uuid4().hex, os.urandom(16)
+            self._pending[session_id] = (data, remote_seed)
+            return HttpResponse(
+                status=200,
+                body=remote_seed
+                + hashlib.sha256(data + remote_seed + self._auth_hash).digest(),
+                cookies={
+                    "TP_SESSIONID": session_id,
+                    "TIMEOUT": str(self._session_timeout),
+                },
+            )
+        session_id = cookies.get("TP_SESSIONID")
+        if path == "handshake2":
+            local_seed, remote_seed = self._pending.pop(session_id)
+            expected = hashlib.sha256(remote_seed + local_seed + self._auth_hash)
+            if data != expected.digest():
+                return HttpResponse(status=403, body=b"", cookies={})
+            self.sessions[session_id] = KlapChiper(
+                local_seed, remote_seed, self._auth_hash
+            )
+            return HttpResponse(status=200, body=b"", cookies={})
+        chiper = self.sessions.get(session_id)
+        if chiper is None:
+            return HttpResponse(status=403, body=b"", cookies={})
+        self.requests += 1
+        seq = params["seq"]
+        request = json.loads(chiper.decrypt(data, seq))
+        response = {"error_code": 0, "result": {"method": request["method"]}}
+        return HttpResponse(
+            status=200,
+            body=chiper._encrypt(json.dumps(response).encode(), seq),
+            cookies={},
+        )
+
+    async def close(self):
+        pass
+
+
+class TapoProtocolStub(TapoProtocol):
+    """
+    Device answering each method with `results[method]`, or with that error code when
+    it is an int, also inside multipleRequest and control_child unless they are given
+    a result themselves. Every request sent is kept in `sent`.
+    """
+
+    def __init__(self, results: dict[str, Any]):
+        self.results = results
+        self.sent: List[TapoRequest] = []
+
+    async def send_request(self, request, retry=3, timeout=None):
+        self.sent.append(request)
+        await asyncio.sleep(0)
+        if request.method == "multipleRequest" and request.method not in self.results:
+            responses = [
+                {"method": it.method, **self._answer(it)}
+                for it in request.params.requests
+            ]
+            return TapoResponse.try_from_json(
+                {"error_code": 0, "result": {"responses": responses}}
+            )
+        return TapoResponse.try_from_json(self._answer(request))
+
+    def _answer(self, request: TapoRequest) -> dict[str, Any]:
+        if request.method == "control_child":
+            inner = request.params.requestData.params.requests
+            responses = [{"method": it.method, **self._answer(it)} for it in inner]
+            response_data = {"error_code": 0, "result": {"responses": responses}}
+            return {"error_code": 0, "result": {"responseData": response_data}}
+        result = self.results[request.method]
+        if isinstance(result, int):
+            return {"error_code": result}
+        return {"error_code": 0, "result": result}
+
+    async def close(self):
+        pass